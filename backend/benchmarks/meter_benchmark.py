@@ -0,0 +1,325 @@
+"""
+Meter inference benchmark
+
+Runs a folder of sample meter photos through the meter pipeline at a given
+concurrency and reports p50/p95/p99 per stage (decode, preprocess,
+inference, postprocess), queue wait, end-to-end latency, images/sec and
+peak RSS of this process and of each inference worker process. Results
+are written as JSON so engines, batch sizes and thread counts can be
+compared between releases.
+
+Targets:
+    service  MeterInferenceExecutor + MeterMicroBatcher, no HTTP
+    route    POST /api/meter/predict through the FastAPI app in-process
+             (meter executor, batcher and jobs only; the chatbot is not started)
+
+Usage (from backend/):
+    python -m benchmarks.meter_benchmark --images data/meter_samples \\
+        --concurrency 20 --engine onnx --batch-size 8 --workers 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+STAGES = ("decode", "preprocess", "inference", "postprocess")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the meter reading pipeline")
+    parser.add_argument("--images", required=True, help="Folder of sample meter photos")
+    parser.add_argument("--target", choices=("service", "route"), default="service")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the image folder")
+    parser.add_argument("--warmup", type=int, default=4, help="Untimed requests before measuring")
+    parser.add_argument("--model", help="Overrides METER_MODEL_PATH")
+    parser.add_argument("--engine", help="Overrides METER_ENGINE")
+    parser.add_argument("--executor", choices=("thread", "process", "sidecar"), help="Overrides METER_EXECUTOR_KIND")
+    parser.add_argument("--workers", type=int, help="Overrides METER_EXECUTOR_WORKERS")
+    parser.add_argument("--batch-size", type=int, help="Overrides METER_BATCH_MAX_SIZE")
+    parser.add_argument("--batch-wait-ms", type=float, help="Overrides METER_BATCH_MAX_WAIT_MS")
+    parser.add_argument("--torch-threads", type=int, help="Sets OMP_NUM_THREADS for inference")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/meter-<timestamp>.json)")
+    return parser.parse_args()
+
+
+def apply_overrides(args: argparse.Namespace):
+    """Configuration is read from the environment at import time, so set it first"""
+    overrides = {
+        "METER_MODEL_PATH": args.model,
+        "METER_ENGINE": args.engine,
+        "METER_EXECUTOR_KIND": args.executor,
+        "METER_EXECUTOR_WORKERS": args.workers,
+        "METER_BATCH_MAX_SIZE": args.batch_size,
+        "METER_BATCH_MAX_WAIT_MS": args.batch_wait_ms,
+        "OMP_NUM_THREADS": args.torch_threads,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[key] = str(value)
+    # Every request must reach the model
+    os.environ["METER_CACHE_SIZE"] = "0"
+    # Enough queue room for the requested concurrency
+    os.environ.setdefault("METER_EXECUTOR_MAX_QUEUE", str(max(args.concurrency * 2, 32)))
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max in milliseconds (nearest-rank)"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        "p50_ms": rank(50),
+        "p95_ms": rank(95),
+        "p99_ms": rank(99),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _child_peak_rss_kib() -> Optional[Dict[int, int]]:
+    """Peak RSS (VmHWM, KiB) of each live child process, from /proc; None off Linux"""
+    proc = Path("/proc")
+    if not (proc / "self" / "status").exists():
+        return None
+    parent = os.getpid()
+    peaks = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # The command name in stat may contain spaces; ppid follows its ")"
+            ppid = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+            if ppid != parent:
+                continue
+            for line in (entry / "status").read_text().splitlines():
+                if line.startswith("VmHWM:"):
+                    peaks[int(entry.name)] = int(line.split()[1])
+        except (OSError, IndexError, ValueError):
+            continue  # exited while we looked
+    return peaks
+
+
+def peak_rss_mb() -> Dict[str, Any]:
+    """
+    Peak resident set size of this process and of each inference worker
+
+    Must be called while the process pool is still up: workers are read from
+    /proc, and RUSAGE_CHILDREN would only report the single largest worker
+    once reaped. workers_sum_mb adds up each worker's own peak, an upper
+    bound on what they held at the same time. Thread executors have no
+    workers; a sidecar's memory is not visible from here.
+    """
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    workers = _child_peak_rss_kib()
+    if workers is None:
+        return {"self_mb": own / 2**20, "workers_mb": None, "workers_sum_mb": None}
+    workers_mb = [kib / 1024 for _, kib in sorted(workers.items())]
+    return {"self_mb": own / 2**20, "workers_mb": workers_mb, "workers_sum_mb": sum(workers_mb)}
+
+
+async def run_requests(predict, images: List[bytes], concurrency: int) -> Dict[str, Any]:
+    """Issue every image through predict with at most concurrency in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[Dict[str, Any]] = []
+    errors = 0
+
+    async def one(image_bytes: bytes):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await predict(image_bytes)
+            except Exception:
+                errors += 1
+                return
+            samples.append({"latency": time.perf_counter() - start, "result": result})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(image) for image in images))
+    return {"samples": samples, "errors": errors, "elapsed": time.perf_counter() - start}
+
+
+def summarize(run: Dict[str, Any]) -> Dict[str, Any]:
+    samples = run["samples"]
+    stage_values = {stage: [] for stage in STAGES}
+    queue_wait = []
+    batch_sizes = []
+
+    for sample in samples:
+        timings = (sample["result"] or {}).get("timings")
+        if not timings:
+            continue
+        for stage in STAGES:
+            stage_values[stage].append(timings[stage])
+        # Whatever the request waited that was not spent in a stage
+        queue_wait.append(max(0.0, sample["latency"] - sum(timings[s] for s in STAGES)))
+        batch_sizes.append(timings["batch_size"])
+
+    return {
+        "requests": len(samples) + run["errors"],
+        "errors": run["errors"],
+        "elapsed_s": run["elapsed"],
+        "images_per_sec": len(samples) / run["elapsed"] if run["elapsed"] else 0.0,
+        "latency": percentiles([s["latency"] for s in samples]),
+        "stages": {stage: percentiles(values) for stage, values in stage_values.items()},
+        "queue_wait": percentiles(queue_wait),
+        "mean_batch_size": sum(batch_sizes) / len(batch_sizes) if batch_sizes else 0.0,
+    }
+
+
+async def benchmark_service(images: List[bytes], args: argparse.Namespace) -> Dict[str, Any]:
+    from services.inference_executor import create_meter_executor
+    from services.meter_batcher import MeterMicroBatcher
+
+    executor = create_meter_executor()
+    batcher = MeterMicroBatcher(executor)
+    await executor.warmup()
+    batcher.start()
+    try:
+        await run_requests(batcher.predict, images[:args.warmup], args.concurrency)
+        run = await run_requests(batcher.predict, images * args.repeat, args.concurrency)
+        peak_rss = peak_rss_mb()
+    finally:
+        await batcher.stop()
+        executor.shutdown()
+
+    summary = summarize(run)
+    summary["peak_rss"] = peak_rss
+    summary["config"] = {
+        "engine": executor.engine,
+        "int8": executor.int8,
+        "executor": executor.kind,
+        "workers": executor.max_workers,
+        "max_batch_size": batcher.max_batch_size,
+        "max_wait_ms": batcher.max_wait * 1000,
+        "model_version": executor.model_version,
+    }
+    return summary
+
+
+def parse_server_timing(header: str) -> Dict[str, Any]:
+    """Stage timings (seconds) and batch size from a Server-Timing header"""
+    timings: Dict[str, Any] = {}
+    for metric in filter(None, (part.strip() for part in header.split(","))):
+        name, *params = (p.strip() for p in metric.split(";"))
+        values = dict(p.split("=", 1) for p in params if "=" in p)
+        if name in STAGES and "dur" in values:
+            timings[name] = float(values["dur"]) / 1000
+        elif name == "batch" and "desc" in values:
+            timings["batch_size"] = int(values["desc"])
+    return timings if all(stage in timings for stage in STAGES) else {}
+
+
+async def benchmark_route(images: List[bytes], args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+    import main
+    from routers import meter
+
+    # Only the meter side of main.lifespan; the chatbot would connect to Neo4j
+    meter.meter_executor.start()
+    meter.meter_batcher.start()
+    meter.meter_jobs.start()
+    try:
+        await meter.meter_executor.warmup()
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+
+            async def predict(image_bytes: bytes):
+                response = await client.post(
+                    "/api/meter/predict",
+                    files={"file": ("meter.jpg", image_bytes, "image/jpeg")}
+                )
+                response.raise_for_status()
+                # Stage timings come back in the Server-Timing header
+                return {"timings": parse_server_timing(response.headers.get("server-timing", ""))}
+
+            await run_requests(predict, images[:args.warmup], 1)
+            run = await run_requests(predict, images * args.repeat, args.concurrency)
+            peak_rss = peak_rss_mb()
+    finally:
+        await meter.meter_jobs.stop()
+        await meter.meter_batcher.stop()
+        meter.meter_executor.shutdown()
+
+    summary = summarize(run)
+    summary["peak_rss"] = peak_rss
+    summary["config"] = {
+        "engine": meter.meter_executor.engine,
+        "int8": meter.meter_executor.int8,
+        "executor": meter.meter_executor.kind,
+        "workers": meter.meter_executor.max_workers,
+        "max_batch_size": meter.meter_batcher.max_batch_size,
+        "max_wait_ms": meter.meter_batcher.max_wait * 1000,
+        "model_version": meter.meter_executor.model_version,
+    }
+    return summary
+
+
+def main():
+    args = parse_args()
+    apply_overrides(args)
+
+    # Run from backend/ so config and services import as in the app
+    backend_dir = Path(__file__).resolve().parent.parent
+    sys.path.insert(0, str(backend_dir))
+
+    from services.meter_engines import list_fixture_images
+
+    image_paths = list_fixture_images(args.images)
+    if not image_paths:
+        raise SystemExit(f"No images found in {args.images}")
+    images = [p.read_bytes() for p in image_paths]
+
+    runner = benchmark_service if args.target == "service" else benchmark_route
+    summary = asyncio.run(runner(images, args))
+
+    report = {
+        "benchmark": "meter",
+        "target": args.target,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "images": len(images),
+        "concurrency": args.concurrency,
+        "repeat": args.repeat,
+        "host": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "omp_num_threads": os.environ.get("OMP_NUM_THREADS"),
+        },
+        **summary,
+    }
+
+    output = Path(args.output or backend_dir / "benchmarks" / "results" /
+                  f"meter-{args.target}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    latency = report["latency"]
+    print(
+        f"{report['requests']} requests, {report['errors']} errors, "
+        f"{report['images_per_sec']:.1f} images/s, "
+        f"p50 {latency.get('p50_ms', 0):.1f} ms, p99 {latency.get('p99_ms', 0):.1f} ms"
+    )
+    for stage in STAGES:
+        values = report["stages"][stage]
+        if values:
+            print(f"  {stage:<12} p50 {values['p50_ms']:7.1f}  p95 {values['p95_ms']:7.1f}  p99 {values['p99_ms']:7.1f} ms")
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,17 @@ import os
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
 OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
 OPENAI_EMBEDDING_MODEL = os.getenv('OPENAI_EMBEDDING_MODEL', 'text-embedding-3-large')
+EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', 'embedding_cache')  # empty disables
+EMBEDDING_PARALLELISM = int(os.getenv('EMBEDDING_PARALLELISM', 1))  # embedding batches in flight
 
 # Neo4j Configuration
 NEO4J_URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
 NEO4J_USERNAME = os.getenv('NEO4J_USERNAME', 'neo4j')
 NEO4J_PASSWORD = os.getenv('NEO4J_PASSWORD', 'password')
 NEO4J_DATABASE = os.getenv('NEO4J_DATABASE', 'neo4j')
+NEO4J_WRITE_BATCH_SIZE = int(os.getenv('NEO4J_WRITE_BATCH_SIZE', 1000))  # rows per UNWIND transaction
+NEO4J_ACTIVE_SLOT_REFRESH = float(os.getenv('NEO4J_ACTIVE_SLOT_REFRESH', 30))  # seconds between re-reads of the active blue/green slot
+LAW_GRAPH_ATTACH_ONLY = os.getenv('LAW_GRAPH_ATTACH_ONLY', 'true').lower() == 'true'  # startup never writes the graph
 
 # Server Configuration
 HOST = os.getenv('HOST', '0.0.0.0')
@@ -22,3 +27,52 @@ LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
 # GraphRAG Configuration
 JSON_DATA_PATH = 'data/luatnhao_structuredv33.converted.json'
+
+# Meter Reading Configuration
+METER_MODEL_PATH = os.getenv('METER_MODEL_PATH', 'best.pt')
+METER_MODEL_DIR = os.getenv('METER_MODEL_DIR', 'models')  # models loadable through /api/meter/admin/models
+METER_EXECUTOR_KIND = os.getenv('METER_EXECUTOR_KIND', 'thread')  # 'thread', 'process' or 'sidecar'
+METER_EXECUTOR_WORKERS = int(os.getenv('METER_EXECUTOR_WORKERS', 2))
+METER_EXECUTOR_MAX_QUEUE = int(os.getenv('METER_EXECUTOR_MAX_QUEUE', 32))
+METER_BATCH_MAX_SIZE = int(os.getenv('METER_BATCH_MAX_SIZE', 8))  # 1 disables micro-batching
+METER_BATCH_MAX_WAIT_MS = float(os.getenv('METER_BATCH_MAX_WAIT_MS', 10))
+METER_DECODE_THREADS = int(os.getenv('METER_DECODE_THREADS', 4))
+METER_MAX_UPLOAD_BYTES = int(os.getenv('METER_MAX_UPLOAD_BYTES', 10 * 1024 * 1024))  # per uploaded image
+METER_BATCH_MAX_FILES = int(os.getenv('METER_BATCH_MAX_FILES', 64))  # per /predict-batch request
+METER_BATCH_MAX_TOTAL_BYTES = int(os.getenv('METER_BATCH_MAX_TOTAL_BYTES', 64 * 1024 * 1024))  # per /predict-batch request
+METER_ENGINE = os.getenv('METER_ENGINE', 'torch')  # 'torch', 'onnx' or 'openvino'
+METER_ENGINE_CACHE_DIR = os.getenv('METER_ENGINE_CACHE_DIR', 'model_cache')
+METER_PARITY_FIXTURES_DIR = os.getenv('METER_PARITY_FIXTURES_DIR', '')  # verify exports against PyTorch
+METER_INT8 = os.getenv('METER_INT8', 'false').lower() == 'true'  # needs the onnx or openvino engine
+METER_INT8_CALIBRATION_DIR = os.getenv('METER_INT8_CALIBRATION_DIR', '')
+METER_INT8_MAX_ACCURACY_DROP = float(os.getenv('METER_INT8_MAX_ACCURACY_DROP', 0.01))
+METER_INT8_MAX_CALIBRATION_IMAGES = int(os.getenv('METER_INT8_MAX_CALIBRATION_IMAGES', 200))
+METER_INT8_EVAL_DIR = os.getenv('METER_INT8_EVAL_DIR', '')  # held-out photos for the accuracy gate
+METER_IMGSZ = int(os.getenv('METER_IMGSZ', 640))  # model input size
+# Adaptive input size: try the smallest size first and retry larger ones
+# while mean detection confidence stays below METER_ADAPTIVE_MIN_CONFIDENCE
+METER_IMGSZ_LADDER = [
+    int(size) for size in os.getenv('METER_IMGSZ_LADDER', '').split(',') if size.strip()
+]
+METER_ADAPTIVE_MIN_CONFIDENCE = float(os.getenv('METER_ADAPTIVE_MIN_CONFIDENCE', 0.6))
+METER_CACHE_SIZE = int(os.getenv('METER_CACHE_SIZE', 1024))  # cached results, 0 disables
+METER_DISPLAY_MODEL_PATH = os.getenv('METER_DISPLAY_MODEL_PATH', '')  # enables two-stage reading
+METER_DISPLAY_IMGSZ = int(os.getenv('METER_DISPLAY_IMGSZ', 320))
+METER_CROP_IMGSZ = int(os.getenv('METER_CROP_IMGSZ', 320))
+METER_DISPLAY_CROP_MARGIN = float(os.getenv('METER_DISPLAY_CROP_MARGIN', 0.15))
+METER_DUPLICATE_IOU = float(os.getenv('METER_DUPLICATE_IOU', 0.5))  # overlapping digits above this are merged
+# Jobs are kept per API worker process; polls must reach the worker that accepted them
+METER_JOBS_WORKERS = int(os.getenv('METER_JOBS_WORKERS', 4))  # background jobs processed at once
+METER_JOBS_MAX_QUEUE = int(os.getenv('METER_JOBS_MAX_QUEUE', 200))  # waiting jobs before 429
+METER_JOBS_RESULT_TTL = float(os.getenv('METER_JOBS_RESULT_TTL', 600))  # seconds finished jobs are kept
+METER_BURST_MAX_FRAMES = int(os.getenv('METER_BURST_MAX_FRAMES', 5))  # per /predict-burst request
+METER_BURST_MIN_CONFIDENCE = float(os.getenv('METER_BURST_MIN_CONFIDENCE', 0.7))  # frames below this do not vote
+METER_BURST_AGREEMENT = int(os.getenv('METER_BURST_AGREEMENT', 2))  # agreeing frames that end a burst early
+METER_SIDECAR_SOCKET = os.getenv('METER_SIDECAR_SOCKET', '/tmp/baytro-meter.sock')
+METER_SIDECAR_CONNECT_TIMEOUT = float(os.getenv('METER_SIDECAR_CONNECT_TIMEOUT', 120))  # seconds, covers model loading
+
+# Startup Configuration
+# Subsystems that must be ready before /ready reports the worker as ready
+READINESS_REQUIRED_SUBSYSTEMS = [
+    name.strip() for name in os.getenv('READINESS_REQUIRED_SUBSYSTEMS', 'meter').split(',') if name.strip()
+]
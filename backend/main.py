@@ -14,15 +14,68 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from config import READINESS_REQUIRED_SUBSYSTEMS
 from routers import meter, chatbot
+from services.metrics import render_metrics
+from services.readiness import ReadinessRegistry, STARTING, READY, FAILED
+
+readiness = ReadinessRegistry(required=READINESS_REQUIRED_SUBSYSTEMS)
+readiness.register("meter")
+readiness.register("chatbot")
+
+
+async def _start_meter():
+    """Load the meter model in every inference worker and warm it up"""
+    readiness.mark("meter", STARTING)
+    try:
+        await meter.meter_executor.warmup()
+        readiness.mark("meter", READY, model_version=meter.meter_executor.model_version)
+    except Exception as e:
+        logger.error(f"Meter service failed to start: {e}", exc_info=True)
+        readiness.mark("meter", FAILED, error=str(e))
+
+
+async def _start_chatbot():
+    """Connect to Neo4j and prepare the GraphRAG service off the event loop"""
+    readiness.mark("chatbot", STARTING)
+    try:
+        await asyncio.to_thread(chatbot.init_services)
+        readiness.mark("chatbot", READY)
+    except Exception as e:
+        logger.error("Chatbot warm-up failed", exc_info=True)
+        readiness.mark("chatbot", FAILED, error=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy initialization runs in the background so the server can answer
+    # liveness checks immediately; /ready reports when it has finished
+    meter.meter_executor.start()
+    meter.meter_batcher.start()
+    meter.meter_jobs.start()
+    startup_tasks = [
+        asyncio.create_task(_start_meter()),
+        asyncio.create_task(_start_chatbot())
+    ]
+    yield
+    for task in startup_tasks:
+        task.cancel()
+    await meter.meter_jobs.stop()
+    await meter.meter_batcher.stop()
+    meter.meter_executor.shutdown(wait=False)
+
 
 # Create FastAPI app
 app = FastAPI(
     title="BayTro Backend API - Enhanced",
     description="Unified backend with Neo4j-powered GraphRAG chatbot",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -64,29 +117,25 @@ async def root():
         }
     }
 
-# Health check
+# Liveness check: cheap, never touches models or Neo4j
 @app.get("/health")
 async def health():
-    from routers.chatbot import graphrag_service
-    
-    health_status = {
+    return {
         "status": "ok",
-        "version": "2.0.0",
-        "services": {
-            "meter": "available",
-            "chatbot": "available" if graphrag_service else "unavailable"
-        }
+        "version": "2.0.0"
     }
-    
-    # Add detailed stats if GraphRAG service is available
-    if graphrag_service:
-        try:
-            stats = graphrag_service.get_stats()
-            health_status["neo4j_stats"] = stats
-        except:
-            pass
-    
-    return health_status
+
+# Readiness check: per-subsystem startup state, 503 until required ones are ready
+@app.get("/ready")
+async def ready():
+    status = readiness.snapshot()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
 
 if __name__ == "__main__":
     import uvicorn
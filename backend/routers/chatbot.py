@@ -1,10 +1,12 @@
 """
 Enhanced Chatbot Router with conversation memory and improved endpoints
 """
-from fastapi import APIRouter, HTTPException
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 from services.neo4j_graphrag_service import Neo4jGraphRAGService
+from services.law_rebuild import GraphLockedError, LawGraphRebuilder
 from services.role_validator_service import RoleValidatorService
 import logging
 
@@ -12,20 +14,40 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize Neo4j GraphRAG service (singleton)
-try:
-    graphrag_service = Neo4jGraphRAGService()
-    logger.info("Neo4j GraphRAG service initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize GraphRAG service: {e}")
-    graphrag_service = None
+# Neo4j GraphRAG and role validator services (singletons), created by
+# init_services() in the background once the app has started
+graphrag_service: Optional[Neo4jGraphRAGService] = None
+role_validator: Optional[RoleValidatorService] = None
+rebuilder: Optional[LawGraphRebuilder] = None
 
-try:
-    role_validator = RoleValidatorService()
-    logger.info("Role Validator service initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Role Validator service: {e}")
-    role_validator = None
+
+def init_services():
+    """
+    Initialize the chatbot services
+
+    Blocking: connects to Neo4j and may build the graph and embeddings, so
+    main.py runs it in a worker thread at startup.
+
+    Raises:
+        Exception: if the GraphRAG service cannot be initialized
+    """
+    global graphrag_service, role_validator, rebuilder
+
+    try:
+        role_validator = RoleValidatorService()
+        logger.info("Role Validator service initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize Role Validator service: {e}")
+        role_validator = None
+
+    try:
+        graphrag_service = Neo4jGraphRAGService()
+        rebuilder = LawGraphRebuilder(graphrag_service)
+        logger.info("Neo4j GraphRAG service initialized successfully")
+    except Exception as e:
+        logger.error(f"Failed to initialize GraphRAG service: {e}")
+        graphrag_service = None
+        raise
 
 
 # In-memory conversation store (in production, use Redis or database)
@@ -202,9 +224,8 @@ async def chatbot_health():
         )
 
     try:
-        # Query Neo4j for node count using the APOC-free method
-        result = graphrag_service._execute_query("MATCH (n) RETURN count(n) as count")
-        node_count = result[0]['count'] if result else 0
+        # Query Neo4j for the node count of the active slot
+        node_count = graphrag_service.count_nodes()
 
         return HealthResponse(
             status="healthy",
@@ -240,36 +261,68 @@ async def get_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/admin/rebuild-index")
-async def rebuild_index():
+@router.post("/admin/sync-index")
+async def sync_index():
     """
-    Admin endpoint to rebuild the graph and vector index
-    WARNING: This will clear and rebuild all data
+    Admin endpoint to apply changes in the law JSON to the graph
+
+    Only added, changed and removed nodes (and their edges and embeddings)
+    are written, so a small amendment takes seconds instead of a rebuild.
+    Returns 409 while a rebuild, sync or ingestion is running.
     """
     if graphrag_service is None:
         raise HTTPException(status_code=503, detail="Service not available")
 
     try:
-        logger.warning("Starting index rebuild - this will delete all existing data")
-        
-        # Clear existing data using raw driver
-        graphrag_service._execute_query("MATCH (n) DETACH DELETE n")
-        logger.info("Existing data cleared")
-
-        # Reinitialize
-        graphrag_service._initialize_graph()
-        graphrag_service._initialize_neo4j_vector_index()
-        
-        logger.info("Index rebuild completed successfully")
-
+        # Blocking Neo4j and embedding calls; keep the event loop free
+        changes = await asyncio.to_thread(graphrag_service.sync_graph)
         return {
-            "message": "Index rebuilt successfully",
+            "message": "Index synced successfully",
             "status": "completed",
-            "stats": graphrag_service.get_stats()
+            "changes": changes
         }
+    except GraphLockedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        logger.error(f"Failed to rebuild index: {e}")
+        logger.error(f"Failed to sync index: {e}")
         raise HTTPException(
             status_code=500,
-            detail=f"Rebuild failed: {str(e)}"
+            detail=f"Sync failed: {str(e)}"
         )
+
+
+@router.post("/admin/rebuild-index", status_code=202)
+async def rebuild_index(request: Request, response: Response):
+    """
+    Admin endpoint to rebuild the graph and vector index without downtime
+
+    The graph is rebuilt from the law JSON in the background, into the idle
+    blue/green slot; queries keep using the current graph until the new one
+    is fully embedded and indexed. Poll GET /admin/rebuild-index (on any
+    worker) for progress. Returns 409 while a rebuild, sync or ingestion is
+    running. Also prepares the graph of a fresh install when workers start
+    attach-only (LAW_GRAPH_ATTACH_ONLY).
+    """
+    if graphrag_service is None or rebuilder is None:
+        raise HTTPException(status_code=503, detail="Service not available")
+
+    try:
+        job = await asyncio.to_thread(rebuilder.start)
+    except GraphLockedError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.warning(f"Started index rebuild {job['job_id']}")
+    response.headers["Location"] = str(request.url_for("rebuild_index_progress"))
+    return job
+
+
+@router.get("/admin/rebuild-index", name="rebuild_index_progress")
+async def rebuild_index_progress():
+    """Progress of the running or last law graph write (rebuild, sync or ingestion)"""
+    if rebuilder is None:
+        raise HTTPException(status_code=503, detail="Service not available")
+
+    job = await asyncio.to_thread(rebuilder.status)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No index rebuild has been started")
+    return job
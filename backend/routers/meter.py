@@ -1,18 +1,50 @@
 """
 Meter Reading Router
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from services.meter_service import MeterReadingService
+import asyncio
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Response
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Tuple
+from config import (
+    METER_BATCH_MAX_FILES, METER_BATCH_MAX_TOTAL_BYTES, METER_BURST_MAX_FRAMES, METER_MAX_UPLOAD_BYTES
+)
+from services.inference_executor import InferenceQueueFullError
+from services.meter_batcher import MeterMicroBatcher
+from services.meter_cache import MeterResultCache
+from services.meter_jobs import MeterJobQueue, MeterJob, JobQueueFullError, JobWorkerMismatchError
+from services.meter_burst import read_burst
+from services.meter_registry import InvalidModelError, MeterModelRegistry, ModelSwapError
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Initialize meter reading service (singleton)
-meter_service = MeterReadingService()
+# Initialize meter inference executor (singleton): a registry serving the
+# active model version from a local worker pool, or from the shared sidecar
+# process when METER_EXECUTOR_KIND=sidecar
+meter_executor = MeterModelRegistry()
+meter_batcher = MeterMicroBatcher(meter_executor)
+meter_cache = MeterResultCache()
+
+
+async def _predict_cached(image_bytes: bytes) -> Tuple[Dict[str, Any], bool]:
+    """Predict through the micro-batcher, serving identical uploads from cache"""
+    cache_key = meter_cache.key(image_bytes, meter_executor.model_version)
+    result = meter_cache.get(cache_key)
+    if result is not None:
+        return result, True
+    result = await meter_batcher.predict(image_bytes)
+    meter_cache.put(cache_key, result)
+    return result, False
+
+
+async def _predict_job(image_bytes: bytes) -> Dict[str, Any]:
+    result, _ = await _predict_cached(image_bytes)
+    return result
+
+
+meter_jobs = MeterJobQueue(_predict_job)
 
 
 # Response Models
@@ -20,22 +52,115 @@ class Detection(BaseModel):
     label: str
     x: float
     conf: float
+    row: int = 0
 
 
 class MeterResponse(BaseModel):
     text: str
     detections: List[Detection]
+    rows: List[str] = []
+    reading: Optional[float] = None
+    confidence: Optional[float] = None
+
+
+class MeterBatchItem(BaseModel):
+    filename: Optional[str] = None
+    text: Optional[str] = None
+    detections: List[Detection] = []
+    rows: List[str] = []
+    reading: Optional[float] = None
+    confidence: Optional[float] = None
+    error: Optional[str] = None
+
+
+class MeterBatchResponse(BaseModel):
+    results: List[MeterBatchItem]
+    succeeded: int
+    failed: int
+
+
+class MeterBurstFrame(BaseModel):
+    filename: Optional[str] = None
+    processed: bool = False
+    text: Optional[str] = None
+    confidence: Optional[float] = None
+    error: Optional[str] = None
+
+
+class MeterBurstResponse(MeterResponse):
+    consensus: bool
+    frames_received: int
+    frames_processed: int
+    frames: List[MeterBurstFrame]
+
+
+class ModelLoadRequest(BaseModel):
+    model_name: str = Field(..., description="Model file name inside METER_MODEL_DIR")
+
+
+class MeterJobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    finished_at: Optional[float] = None
+    result: Optional[MeterResponse] = None
+    error: Optional[str] = None
+
+
+def _meter_response(result: Dict[str, Any]) -> MeterResponse:
+    return MeterResponse(
+        text=result['text'],
+        detections=[Detection(**d) for d in result['detections']],
+        rows=result.get('rows', []),
+        reading=result.get('reading'),
+        confidence=result.get('confidence')
+    )
+
+
+def _job_response(job: MeterJob) -> MeterJobResponse:
+    return MeterJobResponse(
+        job_id=job.id,
+        status=job.status,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        result=_meter_response(job.result) if job.result is not None else None,
+        error=job.error
+    )
+
+
+async def _read_image(file: UploadFile, limit: int = METER_MAX_UPLOAD_BYTES) -> bytes:
+    """Read an uploaded image, rejecting it with 413 once it exceeds limit bytes"""
+    image_bytes = await file.read(limit + 1)
+    if len(image_bytes) > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image too large: {file.filename} (maximum {limit} bytes)"
+        )
+    return image_bytes
+
+
+def _server_timing(timings: Optional[Dict[str, float]]) -> str:
+    """Format service stage timings as a Server-Timing header value"""
+    if not timings:
+        return ""
+    metrics = [
+        f"{stage};dur={seconds * 1000:.2f}"
+        for stage, seconds in timings.items() if stage != "batch_size"
+    ]
+    metrics.append(f"batch;desc={timings.get('batch_size', 1)}")
+    return ", ".join(metrics)
 
 
 # Endpoints
 @router.post("/predict", response_model=MeterResponse)
-async def predict_meter(file: UploadFile = File(...)):
+async def predict_meter(response: Response, file: UploadFile = File(...)):
     """
     Predict meter reading from uploaded image
     
     - **file**: Image file (JPEG, PNG, etc.)
     
-    Returns the predicted meter reading as text and detailed detections
+    Returns the predicted meter reading as text and detailed detections.
+    Per-stage timings are reported in the Server-Timing header.
     """
     try:
         # Validate file type
@@ -48,18 +173,26 @@ async def predict_meter(file: UploadFile = File(...)):
         logger.info(f"Processing meter image: {file.filename}")
 
         # Read image bytes
-        image_bytes = await file.read()
+        image_bytes = await _read_image(file)
         
-        # Predict using service
-        result = await meter_service.predict(image_bytes)
+        # Identical uploads (retries, resubmissions) are served from cache;
+        # otherwise predict on the executor, batched with concurrent uploads
+        result, cache_hit = await _predict_cached(image_bytes)
+        if cache_hit:
+            response.headers["Server-Timing"] = "cache;desc=hit"
+        else:
+            response.headers["Server-Timing"] = _server_timing(result.get("timings"))
         
-        return MeterResponse(
-            text=result['text'],
-            detections=[Detection(**d) for d in result['detections']]
-        )
+        return _meter_response(result)
     
     except HTTPException:
         raise
+    except InferenceQueueFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Meter reading service is busy, please retry shortly"
+        )
     except Exception as e:
         logger.error(f"Error in meter prediction: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -68,11 +201,274 @@ async def predict_meter(file: UploadFile = File(...)):
         )
 
 
+@router.post("/predict-batch", response_model=MeterBatchResponse)
+async def predict_meter_batch(files: List[UploadFile] = File(...)):
+    """
+    Predict meter readings for several images in one request
+
+    - **files**: Image files (JPEG, PNG, etc.), e.g. every room of a building
+
+    Images are run through the model in batches of at most
+    METER_BATCH_MAX_SIZE, each taking one inference queue slot, so a large
+    upload does not hold a worker for one oversized model call. Results are
+    returned in upload order; a file that cannot be processed gets an error
+    entry instead of failing the whole request, including files larger than
+    METER_MAX_UPLOAD_BYTES. Only the request-level caps reject the whole
+    request: more than METER_BATCH_MAX_FILES files (400) or more than
+    METER_BATCH_MAX_TOTAL_BYTES of images (413).
+    """
+    if len(files) > METER_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: {len(files)} (maximum {METER_BATCH_MAX_FILES})"
+        )
+
+    logger.info(f"Processing meter image batch of {len(files)} files")
+
+    items: List[MeterBatchItem] = [MeterBatchItem(filename=f.filename) for f in files]
+    images: List[bytes] = []
+    image_indices: List[int] = []
+    cache_keys: List[str] = []
+    total_bytes = 0
+
+    for idx, file in enumerate(files):
+        if not (file.content_type or "").startswith('image/'):
+            items[idx].error = "File must be an image"
+            continue
+
+        image_bytes = await file.read(METER_MAX_UPLOAD_BYTES + 1)
+        if len(image_bytes) > METER_MAX_UPLOAD_BYTES:
+            items[idx].error = f"Image too large (maximum {METER_MAX_UPLOAD_BYTES} bytes)"
+            continue
+        total_bytes += len(image_bytes)
+        if total_bytes > METER_BATCH_MAX_TOTAL_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch too large (maximum {METER_BATCH_MAX_TOTAL_BYTES} bytes of images)"
+            )
+        cache_key = meter_cache.key(image_bytes, meter_executor.model_version)
+        cached = meter_cache.get(cache_key)
+        if cached is not None:
+            items[idx] = MeterBatchItem(filename=file.filename, **_meter_response(cached).model_dump())
+            continue
+
+        images.append(image_bytes)
+        image_indices.append(idx)
+        cache_keys.append(cache_key)
+
+    if images:
+        chunk_size = meter_batcher.max_batch_size
+        chunks = await asyncio.gather(
+            *(meter_executor.predict_batch(images[start:start + chunk_size])
+              for start in range(0, len(images), chunk_size)),
+            return_exceptions=True
+        )
+        if all(isinstance(chunk, InferenceQueueFullError) for chunk in chunks):
+            logger.warning(str(chunks[0]))
+            raise HTTPException(
+                status_code=503,
+                detail="Meter reading service is busy, please retry shortly"
+            )
+
+        results: List[Any] = []
+        for start, chunk in zip(range(0, len(images), chunk_size), chunks):
+            if isinstance(chunk, Exception):
+                logger.error(f"Error in batch meter prediction: {str(chunk)}", exc_info=chunk)
+                chunk = [chunk] * len(images[start:start + chunk_size])
+            results.extend(chunk)
+
+        for idx, cache_key, result in zip(image_indices, cache_keys, results):
+            if isinstance(result, Exception):
+                items[idx].error = f"Failed to process image: {str(result)}"
+            else:
+                meter_cache.put(cache_key, result)
+                items[idx] = MeterBatchItem(filename=items[idx].filename, **_meter_response(result).model_dump())
+
+    failed = sum(1 for item in items if item.error)
+    return MeterBatchResponse(
+        results=items,
+        succeeded=len(items) - failed,
+        failed=failed
+    )
+
+
+@router.post("/predict-burst", response_model=MeterBurstResponse)
+async def predict_meter_burst(files: List[UploadFile] = File(...)):
+    """
+    Read a meter from a short burst of stills of the same meter
+
+    - **files**: Frames in capture order (JPEG, PNG, etc.)
+
+    Frames are read in order and reading stops as soon as two confident
+    frames agree on the digits ('consensus'). Without agreement the
+    confident frame whose digits agree most with the other frames is
+    returned, ties going to the most confident one.
+    """
+    if len(files) > METER_BURST_MAX_FRAMES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many frames: {len(files)} (maximum {METER_BURST_MAX_FRAMES})"
+        )
+    for file in files:
+        if not (file.content_type or "").startswith('image/'):
+            raise HTTPException(
+                status_code=400,
+                detail=f"File must be an image: {file.filename}"
+            )
+
+    logger.info(f"Processing meter burst of {len(files)} frames")
+    frames = [await _read_image(file) for file in files]
+
+    try:
+        burst = await read_burst(_predict_job, frames)
+    except Exception as e:
+        logger.error(f"Error in burst meter prediction: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to process images: {str(e)}"
+        )
+
+    frame_items = []
+    for file, outcome in zip(files, burst["frames"]):
+        item = MeterBurstFrame(filename=file.filename, processed=outcome is not None)
+        if isinstance(outcome, Exception):
+            item.error = f"Failed to process image: {str(outcome)}"
+        elif outcome is not None:
+            item.text = outcome["text"]
+            item.confidence = outcome["confidence"]
+        frame_items.append(item)
+
+    if burst["result"] is None:
+        errors = [f for f in burst["frames"] if isinstance(f, Exception)]
+        if any(isinstance(e, InferenceQueueFullError) for e in errors):
+            raise HTTPException(
+                status_code=503,
+                detail="Meter reading service is busy, please retry shortly"
+            )
+        raise HTTPException(
+            status_code=422,
+            detail="None of the frames could be processed"
+        )
+
+    return MeterBurstResponse(
+        **_meter_response(burst["result"]).model_dump(),
+        consensus=burst["consensus"],
+        frames_received=len(files),
+        frames_processed=burst["frames_processed"],
+        frames=frame_items
+    )
+
+
+@router.post("/jobs", response_model=MeterJobResponse, status_code=202)
+async def submit_meter_job(request: Request, response: Response, file: UploadFile = File(...)):
+    """
+    Queue a meter image for prediction and return immediately
+
+    - **file**: Image file (JPEG, PNG, etc.)
+
+    Poll GET /jobs/{job_id} for the result. When the queue is full the
+    request is rejected with 429 and a Retry-After header; images larger
+    than METER_MAX_UPLOAD_BYTES are rejected with 413.
+    """
+    if not (file.content_type or "").startswith('image/'):
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an image"
+        )
+
+    image_bytes = await _read_image(file)
+    try:
+        job = meter_jobs.submit(image_bytes)
+    except JobQueueFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=429,
+            detail="Too many meter jobs queued, please retry later",
+            headers={"Retry-After": str(meter_jobs.retry_after())}
+        )
+
+    logger.info(f"Queued meter job {job.id} for {file.filename}")
+    response.headers["Location"] = str(request.url_for("get_meter_job", job_id=job.id))
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=MeterJobResponse)
+async def get_meter_job(job_id: str):
+    """
+    Status of a queued meter job, with the reading once it has succeeded
+
+    Finished jobs can be polled for METER_JOBS_RESULT_TTL seconds. Jobs are
+    kept by the API worker that accepted them; a poll that reaches another
+    worker gets 421 (run one worker or route /jobs stickily).
+    """
+    try:
+        job = meter_jobs.get(job_id)
+    except JobWorkerMismatchError as e:
+        raise HTTPException(status_code=421, detail=str(e))
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Job not found or expired"
+        )
+    return _job_response(job)
+
+
+@router.get("/admin/models")
+async def get_meter_models():
+    """Active and previous meter model versions, and the last load attempt"""
+    return meter_executor.status()
+
+
+@router.post("/admin/models", status_code=202)
+async def load_meter_model(request: ModelLoadRequest):
+    """
+    Admin endpoint to load a new meter model version without downtime
+
+    The model is loaded and warmed up in the background while the current
+    version keeps serving; poll GET /admin/models for progress. The
+    replaced version stays loaded for rollback.
+
+    Only files inside METER_MODEL_DIR can be loaded; other names get 400.
+    """
+    try:
+        meter_executor.load(request.model_name)
+    except InvalidModelError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ModelSwapError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"Loading meter model {request.model_name} in the background")
+    return meter_executor.status()
+
+
+@router.post("/admin/models/rollback")
+async def rollback_meter_model():
+    """Admin endpoint to switch back to the previously active meter model"""
+    try:
+        meter_executor.rollback()
+    except ModelSwapError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return meter_executor.status()
+
+
 @router.get("/health")
 async def meter_health():
     """Health check for meter reading service"""
     return {
         "status": "healthy",
         "model": "YOLO",
-        "model_path": "best.pt"
+        "model_path": meter_executor.model_path,
+        "engine": meter_executor.engine,
+        "int8": meter_executor.int8,
+        "executor": meter_executor.kind,
+        "workers": meter_executor.max_workers,
+        "pending": meter_executor.pending,
+        "max_batch_size": meter_batcher.max_batch_size,
+        "model_version": meter_executor.model_version,
+        "previous_model_version": (
+            meter_executor.previous.model_version if meter_executor.previous is not None else None
+        ),
+        "model_loading": meter_executor.loading,
+        "cache": meter_cache.stats(),
+        "jobs": meter_jobs.stats()
     }
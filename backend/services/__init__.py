@@ -1,5 +1,6 @@
 """Services package"""
 from .neo4j_graphrag_service import Neo4jGraphRAGService
 from .meter_service import MeterReadingService
+from .inference_executor import MeterInferenceExecutor
 
-__all__ = ['Neo4jGraphRAGService',  'MeterReadingService']
+__all__ = ['Neo4jGraphRAGService',  'MeterReadingService', 'MeterInferenceExecutor']
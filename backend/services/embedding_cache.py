@@ -0,0 +1,167 @@
+"""
+Content-addressed on-disk cache of law text embeddings
+
+Rebuilding the index or resetting embeddings after a dimension change
+used to re-embed the whole corpus through the OpenAI API, although the
+law text almost never changes. Embeddings are stored locally under
+sha256(model, dimensions, text), so only texts never seen before reach
+the API.
+
+Layout, one directory per model and dimension count:
+    keys.bin     32-byte digests, one per row
+    vectors.f32  float32 matrix, one row of `dimensions` values per key
+
+Both files are append-only. Vectors are written before their keys, so a
+crash mid-append only leaves rows no key points to; they are cut off on
+the next append.
+
+One instance is shared by the parallel embedding batches, so the in-memory
+index, the vector mapping and the hit counters are guarded by a thread
+lock; new rows are published only together with a mapping that covers them.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = 32
+
+
+class EmbeddingCache:
+    """Append-only, memory-mapped float32 embedding store keyed by content hash"""
+
+    def __init__(self, cache_dir: str, model: str, dimensions: int):
+        self.model = model
+        self.dimensions = dimensions
+        self.path = Path(cache_dir) / f"{re.sub(r'[^A-Za-z0-9._-]', '_', model)}-{dimensions}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._keys_file = self.path / "keys.bin"
+        self._vectors_file = self.path / "vectors.f32"
+        self._index: Dict[bytes, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._keys_read = 0
+        self._state_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._refresh()
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dimensions * 4
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{self.dimensions}\0{text}".encode("utf-8")).digest()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @contextmanager
+    def _lock(self):
+        with open(self.path / ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rows_on_disk(self) -> int:
+        """Rows that have both a complete key and a complete vector"""
+        keys = self._keys_file.stat().st_size // KEY_SIZE if self._keys_file.exists() else 0
+        vectors = self._vectors_file.stat().st_size // self.row_bytes if self._vectors_file.exists() else 0
+        return min(keys, vectors)
+
+    def _refresh(self):
+        """
+        Pick up rows appended since the last read, possibly by another process
+
+        Callers serialize through the file lock (or construction), so only
+        readers run concurrently with it.
+        """
+        rows = self._rows_on_disk()
+        if rows <= self._keys_read:
+            return
+
+        with open(self._keys_file, "rb") as f:
+            f.seek(self._keys_read * KEY_SIZE)
+            data = f.read((rows - self._keys_read) * KEY_SIZE)
+        added = {
+            data[offset:offset + KEY_SIZE]: self._keys_read + offset // KEY_SIZE
+            for offset in range(0, len(data), KEY_SIZE)
+        }
+        # Map the grown file before publishing its rows, so a reader never
+        # looks up a row past the end of the mapping it sees
+        vectors = np.memmap(
+            self._vectors_file, dtype=np.float32, mode="r", shape=(rows, self.dimensions)
+        )
+        with self._state_lock:
+            self._vectors = vectors
+            self._index.update(added)
+            self._keys_read = rows
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached embedding per text, None where it has not been embedded yet"""
+        keys = [self.key(text) for text in texts]
+        with self._state_lock:
+            rows = [self._index.get(key) for key in keys]
+            vectors = self._vectors
+        # Rows are never rewritten, so reading the snapshot needs no lock
+        return [vectors[row].tolist() if row is not None else None for row in rows]
+
+    def put_many(self, texts: Sequence[str], vectors: Sequence[Sequence[float]]):
+        """Append embeddings; vectors of the wrong dimension are not cached"""
+        pending = {
+            self.key(text): vector for text, vector in zip(texts, vectors)
+            if len(vector) == self.dimensions
+        }
+        if not pending:
+            return
+
+        with self._lock():
+            self._refresh()
+            entries = [(key, vector) for key, vector in pending.items() if key not in self._index]
+            if not entries:
+                return
+
+            rows = self._keys_read
+            with open(self._vectors_file, "ab") as f:
+                # Drop vectors a crashed writer left without a key
+                f.truncate(rows * self.row_bytes)
+                f.write(np.asarray([v for _, v in entries], dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._keys_file, "ab") as f:
+                f.truncate(rows * KEY_SIZE)
+                f.write(b"".join(key for key, _ in entries))
+
+            self._refresh()
+
+    def embed_documents(
+        self,
+        embed: Callable[[List[str]], List[List[float]]],
+        texts: List[str]
+    ) -> List[List[float]]:
+        """Embeddings for texts, calling embed only for texts not in the cache"""
+        results = self.get_many(texts)
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        with self._state_lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            # Each distinct text is embedded once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = dict(zip(unique, embed(unique)))
+            self.put_many(unique, [fresh[text] for text in unique])
+            for i in missing:
+                results[i] = fresh[texts[i]]
+
+        return results
@@ -0,0 +1,225 @@
+"""
+Dedicated inference executor for the meter reading model
+
+Keeps image decoding and YOLO inference off the asyncio event loop. Each
+worker (thread or process) owns its own MeterReadingService, so workers never
+share a model instance.
+"""
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from config import (
+    METER_MODEL_PATH, METER_ENGINE, METER_INT8, METER_EXECUTOR_KIND,
+    METER_EXECUTOR_WORKERS, METER_EXECUTOR_MAX_QUEUE, METER_DISPLAY_MODEL_PATH
+)
+from services.metrics import METER_QUEUE_WAIT_SECONDS, observe_meter_results
+
+logger = logging.getLogger(__name__)
+
+# Per-worker state. For the thread pool every worker thread gets its own
+# slot; for the process pool each worker process has a single thread.
+_worker_state = threading.local()
+
+
+class InferenceQueueFullError(RuntimeError):
+    """Raised when the executor already holds its maximum number of requests"""
+
+
+def _init_worker(model_path: str, engine: str, int8: bool):
+    """Load the model once per worker"""
+    from services.meter_service import MeterReadingService
+    _worker_state.service = MeterReadingService(model_path, engine=engine, int8=int8)
+
+
+def _worker_service():
+    service = getattr(_worker_state, "service", None)
+    if service is None:
+        raise RuntimeError("Inference worker was not initialized")
+    return service
+
+
+def _worker_warmup() -> Tuple[float, bool]:
+    """Warm-up time and whether the worker serves the INT8 model"""
+    service = _worker_service()
+    return service.warmup(), service.int8
+
+
+def _worker_predict_batch(images: List[bytes]) -> List[Union[Dict[str, Any], Exception]]:
+    return _worker_service().predict_batch(images)
+
+
+def _worker_call(submitted: float, fn, *args):
+    """Run fn in a worker, also returning how long it sat in the pool queue"""
+    # Wall clock, so the wait is comparable across worker processes
+    return time.time() - submitted, fn(*args)
+
+
+def meter_model_version(model_path: str, engine: str, int8: bool) -> str:
+    """Version string for the weights, engine and precision results come from"""
+    from services.meter_engines import file_digest
+
+    def digest(path: str) -> str:
+        try:
+            return file_digest(path)
+        except OSError:
+            return path
+
+    version = f"{digest(model_path)}-{engine}{'-int8' if int8 else ''}"
+    if METER_DISPLAY_MODEL_PATH:
+        version += f"+display-{digest(METER_DISPLAY_MODEL_PATH)}"
+    return version
+
+
+def create_meter_executor(model_path: str = METER_MODEL_PATH):
+    """
+    Executor for METER_EXECUTOR_KIND
+
+    'thread' and 'process' run model_path in this process's own pool;
+    'sidecar' sends inference to the shared meter sidecar process, which
+    serves its own model.
+    """
+    if METER_EXECUTOR_KIND == "sidecar":
+        from services.meter_sidecar import MeterSidecarClient
+        return MeterSidecarClient()
+    return MeterInferenceExecutor(model_path=model_path)
+
+
+class MeterInferenceExecutor:
+    """Bounded thread or process pool that runs meter predictions"""
+
+    KINDS = ("thread", "process")
+
+    def __init__(
+        self,
+        model_path: str = METER_MODEL_PATH,
+        engine: str = METER_ENGINE,
+        int8: bool = METER_INT8,
+        kind: str = METER_EXECUTOR_KIND,
+        max_workers: int = METER_EXECUTOR_WORKERS,
+        max_queue: int = METER_EXECUTOR_MAX_QUEUE
+    ):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown executor kind '{kind}', expected one of {self.KINDS}")
+
+        self.model_path = model_path
+        self.engine = engine
+        self.requested_int8 = int8
+        # Precision actually served: INT8 can fall back to FP32 when it fails
+        # its accuracy gate, which is only known once the workers are warm
+        self.int8 = int8
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(self.max_workers, max_queue)
+        self._pending = 0
+        self._pool: Optional[Executor] = None
+        self._model_version: Optional[str] = None
+
+    @property
+    def model_version(self) -> str:
+        """Identifies the weights and engine results were produced with"""
+        if self._model_version is None:
+            self._model_version = meter_model_version(self.model_path, self.engine, self.int8)
+        return self._model_version
+
+    @property
+    def pending(self) -> int:
+        """Number of requests currently queued or running"""
+        return self._pending
+
+    def start(self):
+        """Create the worker pool; models are loaded by each worker on first use"""
+        if self._pool is not None:
+            return
+
+        pool_cls = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+        self._pool = pool_cls(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self.model_path, self.engine, self.requested_int8)
+        )
+        logger.info(
+            f"Started meter inference executor: engine={self.engine}, int8={self.requested_int8}, kind={self.kind}, "
+            f"workers={self.max_workers}, max_queue={self.max_queue}"
+        )
+
+    async def warmup(self):
+        """
+        Load the model in every worker and run one inference on each
+
+        Called at startup so the first real upload does not pay for model
+        loading or first-call graph setup. Afterwards int8 and model_version
+        report the precision the workers actually serve.
+        """
+        self.start()
+        loop = asyncio.get_running_loop()
+        # One task per worker; pools spawn a new worker while none are idle
+        warmed = await asyncio.gather(*(
+            loop.run_in_executor(self._pool, _worker_warmup)
+            for _ in range(self.max_workers)
+        ))
+        # Workers share the cached accuracy report, so they agree
+        served_int8 = all(int8 for _, int8 in warmed)
+        if served_int8 != self.int8:
+            self.int8 = served_int8
+            self._model_version = None
+        logger.info(
+            f"Warmed up {len(warmed)} meter inference workers "
+            f"(slowest {max(elapsed for elapsed, _ in warmed) * 1000:.0f} ms, "
+            f"{'INT8' if self.int8 else 'FP32'})"
+        )
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_queue:
+            raise InferenceQueueFullError(
+                f"Meter inference queue is full ({self._pending}/{self.max_queue})"
+            )
+
+        if self._pool is None:
+            self.start()
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            queue_wait, result = await loop.run_in_executor(
+                self._pool, _worker_call, time.time(), fn, *args
+            )
+            METER_QUEUE_WAIT_SECONDS.labels(queue="executor").observe(max(0.0, queue_wait))
+            return result
+        finally:
+            self._pending -= 1
+
+    async def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+        """
+        Predict meter reading from image without blocking the event loop
+
+        Raises:
+            InferenceQueueFullError: if max_queue requests are already in flight
+        """
+        result = (await self.predict_batch([image_bytes]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def predict_batch(self, images: List[bytes]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Predict several images in one batched model call
+
+        A batch occupies a single queue slot. Per-image failures are returned
+        in place of the result instead of being raised.
+
+        Raises:
+            InferenceQueueFullError: if max_queue requests are already in flight
+        """
+        results = await self._submit(_worker_predict_batch, list(images))
+        observe_meter_results(results)
+        return results
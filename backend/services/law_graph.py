@@ -0,0 +1,578 @@
+"""
+Bulk loading of the housing law corpus into Neo4j
+
+The structured law JSON is flattened in Python into one list of node
+properties per label and one list of edges per (type, source label, target
+label). Cross-references between clauses and points are resolved in
+memory at the same time. Each list is written with a parameterized UNWIND
+statement, a batch per transaction, so building the graph takes a handful
+of round trips instead of one per node and relationship.
+
+Every node stores a hash of its properties and one of its outgoing edges,
+so an amended corpus is applied by sync_law_graph as a diff: only new,
+changed and removed nodes and the edges of nodes whose links changed are
+written, and only nodes whose text changed lose their embedding.
+
+The graph can live in one of two label namespaces (blue/green slots) so a
+full rebuild goes into the idle slot while the active one keeps serving;
+a pointer node in the database names the active slot.
+
+A metadata node per slot records the corpus hash, embedding model and
+dimensions and SCHEMA_VERSION the slot was completed with, so a service
+starting against an up-to-date graph can skip initialization entirely.
+"""
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from config import NEO4J_WRITE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+LABELS = ("Chapter", "Section", "Article", "Clause", "Point")
+
+# Bump when node properties, edges, labels or indexes change shape, so
+# graphs built by older code are brought up to date on the next start
+SCHEMA_VERSION = 1
+
+EdgeKey = Tuple[str, str, str]  # relationship type, source label, target label
+NodeKey = Tuple[str, str]  # label, id
+
+
+@dataclass(frozen=True)
+class LawNamespace:
+    """Label prefix that keeps one slot's nodes, constraints and indexes apart"""
+    slot: str
+    prefix: str = ""
+
+    def label(self, label: str) -> str:
+        return f"{self.prefix}{label}"
+
+    def base_label(self, label: str) -> str:
+        return label[len(self.prefix):] if label.startswith(self.prefix) else label
+
+    @property
+    def labels(self) -> Tuple[str, ...]:
+        return tuple(self.label(label) for label in LABELS)
+
+    @property
+    def any_label(self) -> str:
+        """Label expression matching every node of the slot, e.g. MATCH (n:{any_label})"""
+        return "|".join(self.labels)
+
+    def index_name(self, label: str) -> str:
+        return f"law_vector_index_{self.label(label).lower()}"
+
+
+# Blue keeps the unprefixed labels, so graphs built before slots existed are blue
+NAMESPACES = {
+    "blue": LawNamespace("blue"),
+    "green": LawNamespace("green", "Green")
+}
+DEFAULT_NAMESPACE = NAMESPACES["blue"]
+
+# Nodes holding the name of the slot queries should use and each slot's metadata
+STATE_LABEL = "LawGraphState"
+
+
+@dataclass
+class LawGraph:
+    """Flattened law corpus: node rows per label, edge rows per EdgeKey"""
+    nodes: Dict[str, Dict[str, Dict[str, Any]]] = field(
+        default_factory=lambda: {label: {} for label in LABELS}
+    )
+    edges: Dict[EdgeKey, List[Dict[str, Any]]] = field(default_factory=dict)
+    # Hash of each node's outgoing edges, stored once the edges are written
+    edge_hashes: Dict[NodeKey, str] = field(default_factory=dict)
+
+    def add_node(self, label: str, properties: Dict[str, Any]):
+        self.nodes[label][properties["id"]] = properties
+
+    def add_edge(self, rel_type: str, source: NodeKey, target: NodeKey, **properties):
+        """Add an edge between (label, id) pairs"""
+        self.edges.setdefault((rel_type, source[0], target[0]), []).append({
+            "source": source[1],
+            "target": target[1],
+            "properties": properties
+        })
+
+    @property
+    def node_count(self) -> int:
+        return sum(len(rows) for rows in self.nodes.values())
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(rows) for rows in self.edges.values())
+
+    def compute_hashes(self):
+        """Set content_hash on every node row and fill edge_hashes"""
+        outgoing: Dict[NodeKey, List[Any]] = {}
+        for (rel_type, source_label, target_label), rows in self.edges.items():
+            for row in rows:
+                outgoing.setdefault((source_label, row["source"]), []).append(
+                    [rel_type, target_label, row["target"], row["properties"]]
+                )
+
+        for label, rows in self.nodes.items():
+            for node_id, properties in rows.items():
+                properties.pop("content_hash", None)
+                properties["content_hash"] = _hash(properties)
+                self.edge_hashes[(label, node_id)] = _hash(sorted(
+                    outgoing.get((label, node_id), []), key=lambda edge: edge[:3]
+                ))
+
+    def edges_from(self, sources: Set[NodeKey]) -> Dict[EdgeKey, List[Dict[str, Any]]]:
+        """Edge rows whose source node is in sources"""
+        selected = {}
+        for key, rows in self.edges.items():
+            rows = [row for row in rows if (key[1], row["source"]) in sources]
+            if rows:
+                selected[key] = rows
+        return selected
+
+
+def load_corpus(path: str) -> Tuple[List[Dict[str, Any]], str]:
+    """Parsed law JSON and the sha256 of the exact bytes it was parsed from"""
+    with open(path, "rb") as f:
+        raw = f.read()
+    return json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest()
+
+
+def corpus_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def flatten_law_data(law_data: List[Dict[str, Any]]) -> LawGraph:
+    """Turn the structured law JSON into node, CONTAINS and REFERENCES edge lists"""
+    graph = LawGraph()
+    # (source node, references, article_id, clause_id) of every clause and point
+    referencing: List[Tuple[Tuple[str, str], List[Dict[str, Any]], Any, Any]] = []
+
+    for chapter in law_data:
+        chapter_id = chapter["chapter_id"]
+        chapter_node = ("Chapter", f"Chương_{chapter_id}")
+        graph.add_node("Chapter", {
+            "id": chapter_node[1],
+            "title": chapter["title"],
+            "text": chapter["title"],
+            "level": 0
+        })
+
+        if chapter.get("sections"):
+            for section in chapter["sections"]:
+                section_id = section["section_id"]
+                section_node = ("Section", f"Chương_{chapter_id}_Mục_{section_id}")
+                graph.add_node("Section", {
+                    "id": section_node[1],
+                    "title": f"Mục {section_id}: {section['title']}",
+                    "text": section["title"],
+                    "section_id": section_id,
+                    "chapter_id": chapter_id,
+                    "level": 1
+                })
+                graph.add_edge("CONTAINS", chapter_node, section_node)
+
+                for article in section.get("articles", []):
+                    _flatten_article(graph, article, chapter_id, section_node, referencing)
+
+        elif chapter.get("articles"):
+            for article in chapter["articles"]:
+                _flatten_article(graph, article, chapter_id, chapter_node, referencing)
+
+    # References may point forward, so resolve them once every node exists
+    _add_references(graph, referencing)
+    graph.compute_hashes()
+    return graph
+
+
+def _flatten_article(
+    graph: LawGraph,
+    article: Dict[str, Any],
+    chapter_id: Any,
+    parent: Tuple[str, str],
+    referencing: List[Tuple[Tuple[str, str], List[Dict[str, Any]], Any, Any]]
+):
+    article_id = article["article_id"]
+    article_title = article.get("title", "")
+    article_node = ("Article", f"Điều_{article_id}")
+    graph.add_node("Article", {
+        "id": article_node[1],
+        "title": f"Điều {article_id}: {article_title}",
+        "text": article_title,
+        "article_id": article_id,
+        "chapter_id": chapter_id,
+        "level": 2
+    })
+    graph.add_edge("CONTAINS", parent, article_node)
+
+    for clause in article.get("clauses", []):
+        clause_id = clause["clause_id"]
+        clause_node = ("Clause", f"Điều_{article_id}_Khoản_{clause_id}")
+        graph.add_node("Clause", {
+            "id": clause_node[1],
+            "text": clause["text"],
+            "title": f"Điều {article_id} - Khoản {clause_id}",
+            "article_id": article_id,
+            "clause_id": clause_id,
+            "chapter_id": chapter_id,
+            "level": 3,
+            "references": json.dumps(clause.get("references", []))
+        })
+        graph.add_edge("CONTAINS", article_node, clause_node)
+        if clause.get("references"):
+            referencing.append((clause_node, clause["references"], article_id, clause_id))
+
+        for point in clause.get("points", []):
+            point_id = point["point_id"]
+            point_node = ("Point", f"Điều_{article_id}_Khoản_{clause_id}_Điểm_{point_id}")
+            graph.add_node("Point", {
+                "id": point_node[1],
+                "text": point["text"],
+                "title": f"Điều {article_id} - Khoản {clause_id} - Điểm {point_id}",
+                "article_id": article_id,
+                "clause_id": clause_id,
+                "point_id": point_id,
+                "chapter_id": chapter_id,
+                "level": 4,
+                "references": json.dumps(point.get("references", []))
+            })
+            graph.add_edge("CONTAINS", clause_node, point_node)
+            if point.get("references"):
+                referencing.append((point_node, point["references"], article_id, clause_id))
+
+
+def resolve_reference_targets(target: Dict[str, Any], current_article: Any, current_clause: Any) -> List[Tuple[str, str]]:
+    """
+    (label, id) of every node a reference target designates
+
+    'current' stands for the article or clause the reference appears in.
+    Points belong to the target's single clause when it names one,
+    otherwise to the current clause.
+    """
+    def resolve(value, current):
+        return current if value == "current" else value
+
+    article = resolve(target.get("article"), current_article)
+    if article is None:
+        return []
+
+    clauses = target.get("clauses")
+    if isinstance(clauses, list):
+        clauses = [resolve(c, current_clause) for c in clauses]
+    elif "clause" in target:
+        clauses = [resolve(target["clause"], current_clause)]
+    else:
+        clauses = []
+
+    nodes = [("Clause", f"Điều_{article}_Khoản_{c}") for c in clauses] or [("Article", f"Điều_{article}")]
+
+    points = target.get("points")
+    if isinstance(points, list):
+        base_clause = clauses[0] if len(clauses) == 1 else current_clause
+        nodes += [("Point", f"Điều_{article}_Khoản_{base_clause}_Điểm_{p}") for p in points]
+
+    return nodes
+
+
+def _add_references(graph: LawGraph, referencing: List[Tuple[Tuple[str, str], List[Dict[str, Any]], Any, Any]]):
+    """Add a REFERENCES edge per resolved target that exists in the corpus"""
+    edges: Dict[Tuple[Tuple[str, str], Tuple[str, str]], str] = {}
+    for source, references, article_id, clause_id in referencing:
+        for ref in references:
+            for target in resolve_reference_targets(ref.get("target", {}), article_id, clause_id):
+                if target[1] in graph.nodes[target[0]]:
+                    # Several mentions of the same target keep the last text
+                    edges[(source, target)] = ref.get("text", "")
+
+    for (source, target), text in edges.items():
+        graph.add_edge("REFERENCES", source, target, text=text)
+
+
+def _batches(rows: List[Any], size: int) -> Iterator[List[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _run_write(tx, query: str, rows: List[Dict[str, Any]]):
+    tx.run(query, rows=rows).consume()
+
+
+def ensure_constraints(session, namespace: LawNamespace = DEFAULT_NAMESPACE):
+    """Unique id per label; also the index every UNWIND ... MATCH relies on"""
+    for label in namespace.labels:
+        session.run(
+            f"CREATE CONSTRAINT {label.lower()}_id IF NOT EXISTS "
+            f"FOR (n:{label}) REQUIRE n.id IS UNIQUE"
+        ).consume()
+
+
+def read_active_namespace(session) -> LawNamespace:
+    """Namespace the pointer node names, blue when there is none"""
+    record = session.run(f"MATCH (s:{STATE_LABEL} {{key: 'active'}}) RETURN s.slot AS slot").single()
+    return NAMESPACES.get(record["slot"] if record else None, DEFAULT_NAMESPACE)
+
+
+def set_active_namespace(session, namespace: LawNamespace):
+    session.execute_write(
+        lambda tx: tx.run(
+            f"MERGE (s:{STATE_LABEL} {{key: 'active'}}) SET s.slot = $slot, s.switched_at = datetime()",
+            slot=namespace.slot
+        ).consume()
+    )
+
+
+def read_graph_metadata(session, namespace: LawNamespace) -> Optional[Dict[str, Any]]:
+    """What the slot was last completed with, None if it never was"""
+    record = session.run(
+        f"MATCH (m:{STATE_LABEL} {{key: 'metadata', slot: $slot}}) RETURN properties(m) AS metadata",
+        slot=namespace.slot
+    ).single()
+    return record["metadata"] if record else None
+
+
+def write_graph_metadata(session, namespace: LawNamespace, metadata: Dict[str, Any]):
+    session.execute_write(
+        lambda tx: tx.run(
+            f"MERGE (m:{STATE_LABEL} {{key: 'metadata', slot: $slot}}) "
+            f"SET m += $metadata, m.updated_at = datetime()",
+            slot=namespace.slot, metadata=metadata
+        ).consume()
+    )
+
+
+def read_build_state(session, namespace: LawNamespace) -> Optional[Dict[str, Any]]:
+    """What an unfinished rebuild of the slot was started with, None if there is none"""
+    record = session.run(
+        f"MATCH (b:{STATE_LABEL} {{key: 'build', slot: $slot}}) RETURN properties(b) AS build",
+        slot=namespace.slot
+    ).single()
+    return record["build"] if record else None
+
+
+def write_build_state(session, namespace: LawNamespace, metadata: Optional[Dict[str, Any]]):
+    """Mark a rebuild of the slot as started with metadata, or as finished when None"""
+    if metadata is None:
+        query = f"MATCH (b:{STATE_LABEL} {{key: 'build', slot: $slot}}) DELETE b"
+    else:
+        query = (
+            f"MERGE (b:{STATE_LABEL} {{key: 'build', slot: $slot}}) "
+            f"SET b += $metadata, b.started_at = datetime()"
+        )
+    session.execute_write(lambda tx: tx.run(query, slot=namespace.slot, metadata=metadata).consume())
+
+
+def clear_namespace(session, namespace: LawNamespace, batch_size: int = NEO4J_WRITE_BATCH_SIZE):
+    """Delete every node of a slot, its metadata and its vector indexes"""
+    session.run(
+        f"MATCH (m:{STATE_LABEL} {{key: 'metadata', slot: $slot}}) DELETE m", slot=namespace.slot
+    ).consume()
+    for label in LABELS:
+        session.run(f"DROP INDEX {namespace.index_name(label)} IF EXISTS").consume()
+    session.run(
+        f"MATCH (n:{namespace.any_label}) "
+        f"CALL {{ WITH n DETACH DELETE n }} IN TRANSACTIONS OF {int(batch_size)} ROWS"
+    ).consume()
+
+
+def write_nodes(
+    session,
+    nodes: Dict[str, Dict[str, Dict[str, Any]]],
+    batch_size: int = NEO4J_WRITE_BATCH_SIZE,
+    namespace: LawNamespace = DEFAULT_NAMESPACE
+) -> int:
+    """MERGE node rows by id, one UNWIND statement per batch and label"""
+    written = 0
+    for label, rows in nodes.items():
+        query = f"UNWIND $rows AS row MERGE (n:{namespace.label(label)} {{id: row.id}}) SET n += row"
+        for batch in _batches(list(rows.values()), batch_size):
+            session.execute_write(_run_write, query, batch)
+            written += len(batch)
+    return written
+
+
+def write_edges(
+    session,
+    edges: Dict[EdgeKey, List[Dict[str, Any]]],
+    batch_size: int = NEO4J_WRITE_BATCH_SIZE,
+    namespace: LawNamespace = DEFAULT_NAMESPACE
+) -> int:
+    """MERGE edge rows between existing nodes, matched by label and id"""
+    written = 0
+    for (rel_type, source_label, target_label), rows in edges.items():
+        query = f"""
+            UNWIND $rows AS row
+            MATCH (s:{namespace.label(source_label)} {{id: row.source}})
+            MATCH (t:{namespace.label(target_label)} {{id: row.target}})
+            MERGE (s)-[r:{rel_type}]->(t)
+            SET r += row.properties
+        """
+        for batch in _batches(rows, batch_size):
+            session.execute_write(_run_write, query, batch)
+            written += len(batch)
+    return written
+
+
+def write_edge_hashes(
+    session,
+    edge_hashes: Dict[NodeKey, str],
+    batch_size: int = NEO4J_WRITE_BATCH_SIZE,
+    namespace: LawNamespace = DEFAULT_NAMESPACE
+):
+    """Record that the outgoing edges of these nodes are up to date"""
+    by_label: Dict[str, List[Dict[str, Any]]] = {}
+    for (label, node_id), edges_hash in edge_hashes.items():
+        by_label.setdefault(label, []).append({"id": node_id, "edges_hash": edges_hash})
+    for label, rows in by_label.items():
+        query = (
+            f"UNWIND $rows AS row MATCH (n:{namespace.label(label)} {{id: row.id}}) "
+            f"SET n.edges_hash = row.edges_hash"
+        )
+        for batch in _batches(rows, batch_size):
+            session.execute_write(_run_write, query, batch)
+
+
+def write_embeddings(session, label: str, rows: List[Dict[str, Any]]) -> int:
+    """Store {id, embedding} rows on nodes of one (namespaced) label in a single statement"""
+    session.execute_write(
+        _run_write,
+        f"UNWIND $rows AS row MATCH (n:{label} {{id: row.id}}) SET n.embedding = row.embedding",
+        rows
+    )
+    return len(rows)
+
+
+def load_law_graph(
+    driver,
+    database: str,
+    law_data: List[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+    namespace: LawNamespace = DEFAULT_NAMESPACE
+) -> LawGraph:
+    """Flatten law_data and write every node and edge in bulk"""
+    batch_size = batch_size or NEO4J_WRITE_BATCH_SIZE
+    start = time.perf_counter()
+    graph = flatten_law_data(law_data)
+
+    with driver.session(database=database) as session:
+        ensure_constraints(session, namespace)
+        nodes = write_nodes(session, graph.nodes, batch_size, namespace)
+        edges = write_edges(session, graph.edges, batch_size, namespace)
+        write_edge_hashes(session, graph.edge_hashes, batch_size, namespace)
+
+    logger.info(
+        f"Loaded {nodes} nodes and {edges} edges into the {namespace.slot} slot "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    return graph
+
+
+def sync_law_graph(
+    driver,
+    database: str,
+    law_data: List[Dict[str, Any]],
+    batch_size: Optional[int] = None,
+    namespace: LawNamespace = DEFAULT_NAMESPACE
+) -> Dict[str, int]:
+    """
+    Apply law_data to an existing graph, writing only what changed
+
+    Nodes are compared by content_hash and edges_hash. A node whose title
+    or text changed loses its embedding, so only it is re-embedded. Nodes
+    loaded before hashes were stored are rewritten once, keeping their
+    embeddings.
+
+    Returns:
+        Counts of 'added', 'updated' and 'deleted' nodes and of nodes whose
+        outgoing edges were 'relinked'
+    """
+    batch_size = batch_size or NEO4J_WRITE_BATCH_SIZE
+    start = time.perf_counter()
+    graph = flatten_law_data(law_data)
+
+    with driver.session(database=database) as session:
+        ensure_constraints(session, namespace)
+        stored: Dict[NodeKey, Dict[str, Any]] = {}
+        for label in LABELS:
+            for record in session.run(
+                f"MATCH (n:{namespace.label(label)}) "
+                f"RETURN n.id AS id, n.content_hash AS content_hash, n.edges_hash AS edges_hash"
+            ):
+                stored[(label, record["id"])] = {
+                    "content_hash": record["content_hash"], "edges_hash": record["edges_hash"]
+                }
+
+        changed = {label: {} for label in LABELS}
+        added = updated = 0
+        for label, rows in graph.nodes.items():
+            for node_id, properties in rows.items():
+                previous = stored.get((label, node_id))
+                if previous is None:
+                    added += 1
+                elif previous["content_hash"] != properties["content_hash"]:
+                    updated += 1
+                else:
+                    continue
+                changed[label][node_id] = properties
+
+        removed = [key for key in stored if key[1] not in graph.nodes[key[0]]]
+        relink = {
+            key: edges_hash for key, edges_hash in graph.edge_hashes.items()
+            if stored.get(key, {}).get("edges_hash") != edges_hash
+        }
+
+        _upsert_nodes(session, changed, batch_size, namespace)
+        _delete_nodes(session, removed, batch_size, namespace)
+        _delete_outgoing_edges(session, [key for key in relink if key in stored], batch_size, namespace)
+        write_edges(session, graph.edges_from(set(relink)), batch_size, namespace)
+        write_edge_hashes(session, relink, batch_size, namespace)
+
+    counts = {"added": added, "updated": updated, "deleted": len(removed), "relinked": len(relink)}
+    logger.info(
+        f"Synced law graph in {time.perf_counter() - start:.1f}s: {counts['added']} added, "
+        f"{counts['updated']} updated, {counts['deleted']} deleted, {counts['relinked']} relinked"
+    )
+    return counts
+
+
+def _upsert_nodes(session, nodes: Dict[str, Dict[str, Dict[str, Any]]], batch_size: int, namespace: LawNamespace):
+    """MERGE node rows, dropping the embedding of nodes whose title or text changed"""
+    for label, rows in nodes.items():
+        query = f"""
+            UNWIND $rows AS row
+            MERGE (n:{namespace.label(label)} {{id: row.id}})
+            WITH n, row, coalesce(n.title, '') <> coalesce(row.title, '')
+                 OR coalesce(n.text, '') <> coalesce(row.text, '') AS stale
+            SET n += row
+            SET n.embedding = CASE WHEN stale THEN null ELSE n.embedding END
+        """
+        for batch in _batches(list(rows.values()), batch_size):
+            session.execute_write(_run_write, query, batch)
+
+
+def _delete_nodes(session, keys: List[NodeKey], batch_size: int, namespace: LawNamespace):
+    for label in LABELS:
+        ids = [{"id": node_id} for key_label, node_id in keys if key_label == label]
+        query = f"UNWIND $rows AS row MATCH (n:{namespace.label(label)} {{id: row.id}}) DETACH DELETE n"
+        for batch in _batches(ids, batch_size):
+            session.execute_write(_run_write, query, batch)
+
+
+def _delete_outgoing_edges(session, keys: List[NodeKey], batch_size: int, namespace: LawNamespace):
+    for label in LABELS:
+        ids = [{"id": node_id} for key_label, node_id in keys if key_label == label]
+        query = (
+            f"UNWIND $rows AS row MATCH (n:{namespace.label(label)} {{id: row.id}})"
+            f"-[r:CONTAINS|REFERENCES]->() DELETE r"
+        )
+        for batch in _batches(ids, batch_size):
+            session.execute_write(_run_write, query, batch)
@@ -0,0 +1,109 @@
+"""
+Offline law corpus ingestion
+
+Builds the law graph, resolves references, embeds every node and creates
+the vector indexes outside the API process, with the same service code the
+API uses. Run it from backend/ before starting the API, and again after
+the law JSON changes:
+    python -m services.law_ingest --parallelism 8
+    python -m services.law_ingest --rebuild    # fresh build into the idle slot
+
+API workers run with LAW_GRAPH_ATTACH_ONLY=true (the default) and only
+attach to the graph at startup, so this (or the admin rebuild endpoint)
+must run before the API serves its first question. Every step is idempotent (nodes and edges are merged, only nodes
+without an embedding are embedded, through the embedding cache), so a
+failed run is resumed by running the command again. A failed --rebuild
+resumes into its half-built slot as long as the corpus, embedding model
+and schema are unchanged; add --fresh to clear the slot and start over. It takes
+the same graph lock as the API's rebuild and sync endpoints, so it exits
+with an error while one of them is running.
+"""
+if __name__ == "__main__":
+    # Same .env as the API; must be loaded before config is imported
+    from pathlib import Path
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env", override=True)
+
+import argparse
+import logging
+import sys
+import time
+
+from config import JSON_DATA_PATH, EMBEDDING_PARALLELISM
+from services.law_rebuild import GraphLock, GraphLockedError
+from services.neo4j_graphrag_service import Neo4jGraphRAGService
+
+logger = logging.getLogger(__name__)
+
+
+def _log_phase(phase: str, done: int, total: int):
+    if done == 0:
+        logger.info(f"Rebuild phase: {phase}")
+
+
+def ingest(service: Neo4jGraphRAGService, rebuild: bool = False, retries: int = 2, fresh: bool = False) -> bool:
+    """
+    Prepare the law graph; returns whether every node ended up embedded
+
+    Embedding batches that fail (API errors, rate limits) are retried up to
+    `retries` more times; each pass only embeds what is still missing. With
+    fresh set, a rebuild never resumes an unfinished one.
+    """
+    if rebuild:
+        try:
+            with GraphLock(service.driver, service.database, "rebuild") as lock:
+                def report(phase: str, done: int, total: int):
+                    _log_phase(phase, done, total)
+                    lock.report(phase, done, total)
+
+                result = lock.result = service.rebuild_graph(report, embed_retries=retries, resume=not fresh)
+        except RuntimeError as e:
+            logger.error(str(e))
+            return False
+        logger.info(f"Rebuilt the {result['slot']} slot: {result['nodes']} nodes, {result['edges']} edges")
+        return True
+
+    for attempt in range(retries + 1):
+        try:
+            if service.prepare_graph():
+                return True
+        except GraphLockedError as e:
+            logger.error(str(e))
+            return False
+        if attempt < retries:
+            logger.info(f"Retrying missing embeddings ({attempt + 1}/{retries})")
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and embed the law graph in Neo4j")
+    parser.add_argument("--json", default=JSON_DATA_PATH, help="Structured law JSON")
+    parser.add_argument("--parallelism", type=int, default=EMBEDDING_PARALLELISM,
+                        help="Embedding batches sent to the API at once")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Build from scratch into the idle blue/green slot, then switch to it")
+    parser.add_argument("--fresh", action="store_true",
+                        help="With --rebuild: clear the idle slot instead of resuming an unfinished rebuild")
+    parser.add_argument("--retries", type=int, default=2,
+                        help="Extra passes over nodes whose embedding batch failed")
+    args = parser.parse_args()
+    if args.fresh and not args.rebuild:
+        parser.error("--fresh only applies to --rebuild")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    start = time.perf_counter()
+    # attach_only: construction only connects; the work happens in ingest()
+    service = Neo4jGraphRAGService(json_path=args.json, attach_only=True, embed_parallelism=args.parallelism)
+    try:
+        complete = ingest(service, rebuild=args.rebuild, retries=args.retries, fresh=args.fresh)
+    finally:
+        service.close()
+
+    if not complete:
+        logger.error("Some nodes still have no embedding; run the command again to resume")
+        sys.exit(1)
+    logger.info(f"Law graph ready in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
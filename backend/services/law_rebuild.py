@@ -0,0 +1,228 @@
+"""
+Law graph write lock and background blue/green rebuild
+
+Rebuilds, syncs and startup or offline ingestion all write the law graph,
+so they take a single lock kept in Neo4j (a LawGraphLock node), whichever
+process or API worker runs them. The node also carries the phase and
+percent of the running operation, so any worker can report progress. A
+lock whose holder stopped sending heartbeats (a crashed process) is taken
+over after LOCK_STALE_SECONDS.
+
+A rebuild loads, embeds and indexes the corpus into the idle slot on a
+worker thread while queries keep using the active one, then switches the
+service over (see Neo4jGraphRAGService.rebuild_graph).
+"""
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+ABANDONED = "abandoned"
+
+LOCK_LABEL = "LawGraphLock"
+HEARTBEAT_SECONDS = 15
+LOCK_STALE_SECONDS = 120
+
+# Share of the overall rebuild progress each phase accounts for, in order
+PHASE_WEIGHTS = {
+    "clearing": 5,
+    "loading": 15,
+    "embedding": 70,
+    "indexing": 8,
+    "switching": 2
+}
+
+
+class GraphLockedError(RuntimeError):
+    """Raised when another rebuild, sync or ingestion is writing the law graph"""
+
+
+def _percent(phase: str, done: int, total: int) -> float:
+    completed = 0
+    for name, weight in PHASE_WEIGHTS.items():
+        if name == phase:
+            fraction = done / total if total else 0.0
+            return round(completed + weight * min(fraction, 1.0), 1)
+        completed += weight
+    return 0.0
+
+
+class GraphLock:
+    """
+    Exclusive, cluster-wide right to write the law graph
+
+    Use as a context manager; the operation is recorded as failed if the
+    block raises. Set `result` before leaving the block to publish it.
+
+    Raises:
+        GraphLockedError: on entry, if another holder is alive
+    """
+
+    def __init__(self, driver, database: str, operation: str):
+        self.driver = driver
+        self.database = database
+        self.operation = operation
+        self.job_id = uuid.uuid4().hex
+        self.result: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+
+    def acquire(self):
+        with self.driver.session(database=self.database) as session:
+            session.run(
+                f"CREATE CONSTRAINT law_graph_lock_key IF NOT EXISTS "
+                f"FOR (l:{LOCK_LABEL}) REQUIRE l.key IS UNIQUE"
+            ).consume()
+            record = session.execute_write(self._acquire)
+
+        if record["busy"]:
+            held = record["lock"]
+            raise GraphLockedError(
+                f"Law graph {held.get('operation')} {held.get('job_id')} is already running "
+                f"({held.get('phase') or 'starting'})"
+            )
+        threading.Thread(
+            target=self._heartbeat, name=f"law-graph-lock-{self.job_id[:8]}", daemon=True
+        ).start()
+        logger.info(f"Acquired the law graph lock for {self.operation} {self.job_id}")
+
+    def _acquire(self, tx):
+        # The first SET takes the node's write lock, so the state read after
+        # it cannot change underneath us before we commit
+        return tx.run(
+            f"""
+            MERGE (l:{LOCK_LABEL} {{key: 'graph'}})
+            SET l.touched_at = timestamp()
+            WITH l, coalesce(l.status = $running AND l.heartbeat > timestamp() - $stale_ms, false) AS busy
+            FOREACH (_ IN CASE WHEN busy THEN [] ELSE [1] END |
+                SET l.job_id = $job_id, l.operation = $operation, l.status = $running,
+                    l.phase = null, l.phase_done = 0, l.phase_total = 0, l.percent = 0.0,
+                    l.started_at = timestamp() / 1000.0, l.finished_at = null,
+                    l.heartbeat = timestamp(), l.error = null, l.result = null
+            )
+            RETURN busy, properties(l) AS lock
+            """,
+            job_id=self.job_id, operation=self.operation, running=RUNNING,
+            stale_ms=LOCK_STALE_SECONDS * 1000
+        ).single()
+
+    def _update(self, **properties):
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(
+                lambda tx: tx.run(
+                    f"MATCH (l:{LOCK_LABEL} {{key: 'graph', job_id: $job_id}}) "
+                    f"SET l += $properties, l.heartbeat = timestamp()",
+                    job_id=self.job_id, properties=properties
+                ).consume()
+            )
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self._update()
+            except Exception as e:
+                logger.warning(f"Law graph lock heartbeat failed: {e}")
+
+    def report(self, phase: str, done: int, total: int):
+        """Publish the progress of the running operation"""
+        try:
+            self._update(phase=phase, phase_done=done, phase_total=total, percent=_percent(phase, done, total))
+        except Exception as e:
+            logger.warning(f"Could not record law graph progress: {e}")
+
+    def release(self, error: Optional[str] = None):
+        self._stop.set()
+        properties = {"status": FAILED if error else SUCCEEDED, "error": error}
+        if not error:
+            properties["percent"] = 100.0
+        if self.result is not None:
+            properties["result"] = json.dumps(self.result)
+        with self.driver.session(database=self.database) as session:
+            session.execute_write(
+                lambda tx: tx.run(
+                    f"MATCH (l:{LOCK_LABEL} {{key: 'graph', job_id: $job_id}}) "
+                    f"SET l += $properties, l.finished_at = timestamp() / 1000.0",
+                    job_id=self.job_id, properties=properties
+                ).consume()
+            )
+
+    def __enter__(self) -> "GraphLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            self.release((str(exc_val) or exc_type.__name__) if exc_val is not None else None)
+        except Exception as e:
+            # The lock expires once heartbeats stop
+            logger.error(f"Could not release the law graph lock: {e}")
+
+
+def read_graph_job(driver, database: str) -> Optional[Dict[str, Any]]:
+    """The running or last law graph write (rebuild, sync or ingest), as seen by any worker"""
+    with driver.session(database=database) as session:
+        record = session.run(
+            f"MATCH (l:{LOCK_LABEL} {{key: 'graph'}}) "
+            f"RETURN properties(l) AS lock, timestamp() - l.heartbeat AS heartbeat_age_ms"
+        ).single()
+    if record is None or record["lock"].get("job_id") is None:
+        return None
+
+    lock = record["lock"]
+    status = lock.get("status")
+    if status == RUNNING and (record["heartbeat_age_ms"] or 0) > LOCK_STALE_SECONDS * 1000:
+        status = ABANDONED
+    return {
+        "job_id": lock.get("job_id"),
+        "operation": lock.get("operation"),
+        "status": status,
+        "phase": lock.get("phase"),
+        "phase_done": lock.get("phase_done"),
+        "phase_total": lock.get("phase_total"),
+        "percent": lock.get("percent"),
+        "started_at": lock.get("started_at"),
+        "finished_at": lock.get("finished_at"),
+        "result": json.loads(lock["result"]) if lock.get("result") else None,
+        "error": lock.get("error")
+    }
+
+
+class LawGraphRebuilder:
+    """Starts rebuilds of a Neo4jGraphRAGService on a thread, under the graph lock"""
+
+    def __init__(self, service):
+        self.service = service
+
+    def start(self) -> Dict[str, Any]:
+        """
+        Take the graph lock and start a rebuild in the background
+
+        Raises:
+            GraphLockedError: if a rebuild, sync or ingestion is running anywhere
+        """
+        lock = GraphLock(self.service.driver, self.service.database, "rebuild")
+        lock.acquire()
+        threading.Thread(
+            target=self._run, args=(lock,), name=f"law-rebuild-{lock.job_id[:8]}", daemon=True
+        ).start()
+        return self.status()
+
+    def status(self) -> Optional[Dict[str, Any]]:
+        return read_graph_job(self.service.driver, self.service.database)
+
+    def _run(self, lock: GraphLock):
+        error = None
+        try:
+            lock.result = self.service.rebuild_graph(lock.report)
+        except Exception as e:
+            logger.error(f"Law graph rebuild {lock.job_id} failed: {e}", exc_info=True)
+            error = str(e) or type(e).__name__
+        try:
+            lock.release(error)
+        except Exception as e:
+            logger.error(f"Could not release the law graph lock: {e}")
@@ -0,0 +1,118 @@
+"""
+Dynamic micro-batching for meter predictions
+
+Concurrent predict calls are gathered until either max_batch_size images are
+waiting or max_wait_ms has passed since the first one arrived, then sent to
+the inference executor as one batched model call.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import METER_BATCH_MAX_SIZE, METER_BATCH_MAX_WAIT_MS
+from services.inference_executor import MeterInferenceExecutor
+from services.metrics import METER_QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class MeterMicroBatcher:
+    """Groups concurrent single-image predictions into batched executor calls"""
+
+    def __init__(
+        self,
+        executor: MeterInferenceExecutor,
+        max_batch_size: int = METER_BATCH_MAX_SIZE,
+        max_wait_ms: float = METER_BATCH_MAX_WAIT_MS
+    ):
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch_size > 1
+
+    def start(self):
+        """Start the background collector (must be called from the event loop)"""
+        if not self.enabled or self._collector is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._collector = asyncio.create_task(self._collect())
+        logger.info(
+            f"Started meter micro-batcher: max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait * 1000:.1f}"
+        )
+
+    async def stop(self):
+        """Stop collecting and fail any request still waiting for a batch"""
+        if self._collector is None:
+            return
+        self._collector.cancel()
+        try:
+            await self._collector
+        except asyncio.CancelledError:
+            pass
+        self._collector = None
+
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Meter micro-batcher stopped"))
+
+    async def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+        """Predict meter reading, sharing a model call with concurrent requests"""
+        if not self.enabled:
+            return await self.executor.predict(image_bytes)
+
+        if self._collector is None:
+            self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image_bytes, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            dispatched = time.perf_counter()
+            for _, _, enqueued in batch:
+                METER_QUEUE_WAIT_SECONDS.labels(queue="batcher").observe(dispatched - enqueued)
+
+            # Dispatch without waiting so the next batch can start collecting
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: List[Tuple[bytes, asyncio.Future, float]]):
+        try:
+            results = await self.executor.predict_batch([image for image, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,107 @@
+"""
+Multi-frame (burst) meter reading with early-exit consensus
+
+The app can capture a short burst of stills of the same meter. Frames are
+read in capture order and reading stops as soon as two confident frames
+agree on the digits, so most bursts cost two inferences while blurry or
+glare-hit frames no longer end in a declined reading.
+"""
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import METER_BURST_MIN_CONFIDENCE, METER_BURST_AGREEMENT
+
+logger = logging.getLogger(__name__)
+
+
+def _digits_key(result: Dict[str, Any]) -> Tuple[str, ...]:
+    """What two frames must share to agree: the digit string of every row"""
+    return tuple(result.get("rows") or [result["text"]])
+
+
+def _shared_prefix(a: Tuple[str, ...], b: Tuple[str, ...]) -> int:
+    """Number of leading digits two reads share, row by row"""
+    shared = 0
+    for row_a, row_b in zip(a, b):
+        common = len(os.path.commonprefix([row_a, row_b]))
+        shared += common
+        if common < min(len(row_a), len(row_b)) or len(row_a) != len(row_b):
+            break
+    return shared
+
+
+def _pick_fallback(candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    The frame that agrees most with the others when none reached consensus
+
+    Agreement is the total number of leading digits a frame shares with
+    every other frame, so neither a confident partial read nor a read with
+    stray extra digits (a serial number) wins on its own; ties go to the
+    most confident frame.
+    """
+    keys = [_digits_key(c) for c in candidates]
+
+    def rank(i: int) -> Tuple[int, float]:
+        agreement = sum(_shared_prefix(keys[i], keys[j]) for j in range(len(keys)) if j != i)
+        return agreement, candidates[i]["confidence"]
+
+    return candidates[max(range(len(candidates)), key=rank)]
+
+
+async def read_burst(
+    predict: Callable[[bytes], Awaitable[Dict[str, Any]]],
+    frames: List[bytes],
+    min_confidence: float = METER_BURST_MIN_CONFIDENCE,
+    agreement: int = METER_BURST_AGREEMENT
+) -> Dict[str, Any]:
+    """
+    Read frames in order until `agreement` confident frames give the same digits
+
+    Returns:
+        Dict with 'result' (the agreed reading, otherwise the confident frame
+        agreeing most with the others, see _pick_fallback; None only if every
+        frame failed), 'consensus', 'frames_processed'
+        and 'frames' (per-frame result or exception, None for skipped frames)
+    """
+    outcomes: List[Optional[Any]] = [None] * len(frames)
+    votes: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    read: List[Dict[str, Any]] = []
+
+    for idx, image_bytes in enumerate(frames):
+        try:
+            result = await predict(image_bytes)
+        except Exception as e:
+            # One unreadable frame should not sink the burst
+            logger.warning(f"Burst frame {idx} failed: {e}")
+            outcomes[idx] = e
+            continue
+        outcomes[idx] = result
+
+        if not result["detections"]:
+            continue
+        read.append(result)
+
+        if result["confidence"] >= min_confidence:
+            agreeing = votes.setdefault(_digits_key(result), [])
+            agreeing.append(result)
+            if len(agreeing) >= agreement:
+                return {
+                    "result": max(agreeing, key=lambda r: r["confidence"]),
+                    "consensus": True,
+                    "frames_processed": idx + 1,
+                    "frames": outcomes
+                }
+
+    confident = [r for r in read if r["confidence"] >= min_confidence]
+    if confident or read:
+        best = _pick_fallback(confident or read)
+    else:
+        # No digits on any frame: still report an (empty) reading if one succeeded
+        best = next((o for o in outcomes if isinstance(o, dict)), None)
+    return {
+        "result": best,
+        "consensus": False,
+        "frames_processed": len(frames),
+        "frames": outcomes
+    }
@@ -0,0 +1,75 @@
+"""
+Content-hash result cache for meter predictions
+
+Tenants often resubmit the exact same photo (after a declined reading or an
+upload retry). Results are cached under a hash of the image bytes and the
+model version, so an identical upload skips the detector entirely.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config import METER_CACHE_SIZE
+from services.metrics import METER_CACHE_LOOKUPS
+
+
+class MeterResultCache:
+    """Bounded, thread-safe LRU cache of predict() results"""
+
+    def __init__(self, max_entries: int = METER_CACHE_SIZE):
+        self.max_entries = max(0, max_entries)
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def key(image_bytes: bytes, model_version: str) -> str:
+        """Cache key for an image under a given model version"""
+        return f"{model_version}:{hashlib.sha256(image_bytes).hexdigest()}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result and mark it most recently used"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                METER_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            METER_CACHE_LOOKUPS.labels(result="hit").inc()
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result, evicting the least recently used entry when full"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for health and monitoring endpoints"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
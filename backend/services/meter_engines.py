@@ -0,0 +1,270 @@
+"""
+Inference engines for the meter reading model
+
+The PyTorch weights (best.pt) can be exported once to ONNX or OpenVINO IR for
+faster CPU inference. Exported artifacts are cached on disk, keyed by the
+weights' content hash, and verified against the PyTorch model on a fixture
+set before they are used.
+
+Run as a script to export and verify ahead of deployment:
+
+    python -m services.meter_engines --engine onnx --fixtures data/meter_fixtures
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import (
+    METER_ENGINE, METER_ENGINE_CACHE_DIR, METER_PARITY_FIXTURES_DIR, METER_INT8
+)
+
+logger = logging.getLogger(__name__)
+
+# Engine name -> ultralytics export format (None = serve the .pt directly)
+ENGINES = {
+    "torch": None,
+    "onnx": "onnx",
+    "openvino": "openvino",
+}
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+# Detections are considered identical when their positions and confidences
+# are within these tolerances
+PARITY_X_TOLERANCE = 2.0  # pixels
+PARITY_CONF_TOLERANCE = 0.05
+
+# Marks quantized artifacts in the cache
+INT8_SUFFIX = "-int8"
+
+
+class EngineParityError(RuntimeError):
+    """Raised when an exported engine disagrees with the PyTorch model"""
+
+
+def file_digest(path: str, length: int = 12) -> str:
+    """Short SHA-256 of a model file, used to key cached artifacts"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+
+def list_fixture_images(fixture_dir: str) -> List[Path]:
+    """Sorted list of image files in a fixture folder"""
+    return sorted(
+        p for p in Path(fixture_dir).iterdir()
+        if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+@contextmanager
+def _cache_lock(cache_dir: Path):
+    """Serialize exports across worker processes sharing one cache"""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(cache_dir / ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _artifact_path(model_path: str, engine: str, cache_dir: Path, int8: bool = False) -> Path:
+    stem = Path(model_path).stem
+    digest = file_digest(model_path)
+    if int8:
+        digest += INT8_SUFFIX
+    if engine == "openvino":
+        return cache_dir / f"{stem}-{digest}_openvino_model"
+    return cache_dir / f"{stem}-{digest}.{ENGINES[engine]}"
+
+
+def is_int8_artifact(path: str) -> bool:
+    """Whether a path returned by resolve_model_path is the quantized artifact"""
+    return INT8_SUFFIX in Path(path).name
+
+
+def compare_results(reference: Dict[str, Any], candidate: Dict[str, Any]) -> Optional[str]:
+    """
+    Compare two predict() results
+
+    Returns:
+        None if they match within tolerance, otherwise a short description
+        of the first difference
+    """
+    if reference["text"] != candidate["text"]:
+        return f"text {reference['text']!r} != {candidate['text']!r}"
+    if len(reference["detections"]) != len(candidate["detections"]):
+        return f"{len(reference['detections'])} detections != {len(candidate['detections'])}"
+
+    for ref, cand in zip(reference["detections"], candidate["detections"]):
+        if abs(ref["x"] - cand["x"]) > PARITY_X_TOLERANCE:
+            return f"x {ref['x']:.1f} != {cand['x']:.1f} for '{ref['label']}'"
+        if abs(ref["conf"] - cand["conf"]) > PARITY_CONF_TOLERANCE:
+            return f"conf {ref['conf']:.3f} != {cand['conf']:.3f} for '{ref['label']}'"
+
+    return None
+
+
+def check_parity(reference, candidate, fixture_dir: str) -> Dict[str, Any]:
+    """
+    Run two MeterReadingService instances over a fixture folder
+
+    Returns:
+        Report with the number of images compared and any mismatches
+    """
+    images = list_fixture_images(fixture_dir)
+    mismatches = []
+
+    for image_path in images:
+        image_bytes = image_path.read_bytes()
+        try:
+            expected = reference.predict(image_bytes)
+        except ValueError:
+            # Fixture cannot be decoded; nothing to compare
+            continue
+        diff = compare_results(expected, candidate.predict(image_bytes))
+        if diff:
+            mismatches.append({"image": image_path.name, "difference": diff})
+
+    return {
+        "fixture_dir": str(fixture_dir),
+        "images": len(images),
+        "mismatches": mismatches,
+        "passed": not mismatches
+    }
+
+
+def _export(model_path: str, engine: str, target: Path):
+    from ultralytics import YOLO
+
+    logger.info(f"Exporting {model_path} to {engine}...")
+    # Dynamic axes keep batched and variable-size inference working
+    exported = Path(YOLO(model_path).export(format=ENGINES[engine], dynamic=True))
+
+    if target.exists():
+        if target.is_dir():
+            shutil.rmtree(target)
+        else:
+            target.unlink()
+    shutil.move(str(exported), str(target))
+    logger.info(f"Cached {engine} artifact at {target}")
+
+
+def resolve_model_path(
+    model_path: str,
+    engine: str = METER_ENGINE,
+    cache_dir: str = METER_ENGINE_CACHE_DIR,
+    fixture_dir: Optional[str] = METER_PARITY_FIXTURES_DIR,
+    int8: bool = METER_INT8
+) -> str:
+    """
+    Return the model file to load for the requested engine
+
+    Exports best.pt on first use and reuses the cached artifact afterwards.
+    When a fixture folder is configured, an artifact must match the PyTorch
+    model on it before it is accepted; the report is cached next to it, and
+    an artifact without one is checked on its next use. With int8 set, an
+    INT8 artifact is built on top and served only if it passes the
+    accuracy gate in services.meter_quantization.
+
+    Raises:
+        EngineParityError: if the exported engine fails the parity check
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown meter engine '{engine}', expected one of {list(ENGINES)}")
+
+    if ENGINES[engine] is None:
+        if int8:
+            logger.warning("INT8 mode needs the onnx or openvino engine; serving PyTorch FP32")
+        return model_path
+
+    cache = Path(cache_dir)
+    target = _artifact_path(model_path, engine, cache)
+    report_path = Path(f"{target}.parity.json")
+
+    with _cache_lock(cache):
+        if not target.exists():
+            report_path.unlink(missing_ok=True)
+            _export(model_path, engine, target)
+
+        if report_path.exists():
+            report = json.loads(report_path.read_text())
+        elif fixture_dir:
+            # Also covers artifacts exported before fixtures were configured
+            from services.meter_service import MeterReadingService
+
+            # engine="torch" loads a path as given, here the exported artifact itself
+            report = check_parity(
+                MeterReadingService(model_path, engine="torch", int8=False),
+                MeterReadingService(str(target), engine="torch", int8=False),
+                fixture_dir
+            )
+            report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            if report["passed"]:
+                logger.info(f"{engine} engine matches PyTorch on {report['images']} fixtures")
+        else:
+            report = None
+            logger.warning(
+                f"Serving the {engine} artifact unverified; set METER_PARITY_FIXTURES_DIR "
+                f"to check it against PyTorch"
+            )
+
+        if report is not None and not report["passed"]:
+            raise EngineParityError(
+                f"{engine} engine differs from PyTorch on "
+                f"{len(report['mismatches'])}/{report['images']} fixtures, see {report_path}"
+            )
+
+    if int8:
+        return _resolve_int8(model_path, engine, str(target), cache)
+    return str(target)
+
+
+def _resolve_int8(model_path: str, engine: str, fp32_path: str, cache: Path) -> str:
+    """Return the INT8 artifact if it passed its accuracy gate, else the FP32 one"""
+    from services.meter_quantization import quantize_engine
+
+    target = _artifact_path(model_path, engine, cache, int8=True)
+    report_path = Path(f"{target}.accuracy.json")
+
+    with _cache_lock(cache):
+        if not report_path.exists():
+            report = quantize_engine(model_path, engine, fp32_path, target)
+            report_path.write_text(json.dumps(report, indent=2))
+        else:
+            report = json.loads(report_path.read_text())
+
+    if not report["passed"]:
+        logger.warning(
+            f"Refusing INT8 {engine} model: accuracy drop {report['accuracy_drop']:.3f} "
+            f"exceeds {report['max_accuracy_drop']:.3f}; serving FP32 instead"
+        )
+        return fp32_path
+
+    return str(target)
+
+
+if __name__ == "__main__":
+    import argparse
+    from config import METER_MODEL_PATH
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Export and verify a meter inference engine")
+    parser.add_argument("--model", default=METER_MODEL_PATH)
+    parser.add_argument("--engine", default=METER_ENGINE, choices=list(ENGINES))
+    parser.add_argument("--cache-dir", default=METER_ENGINE_CACHE_DIR)
+    parser.add_argument("--fixtures", default=METER_PARITY_FIXTURES_DIR)
+    parser.add_argument("--int8", action="store_true", default=METER_INT8)
+    args = parser.parse_args()
+
+    path = resolve_model_path(args.model, args.engine, args.cache_dir, args.fixtures, args.int8)
+    print(path)
@@ -0,0 +1,187 @@
+"""
+Asynchronous meter prediction jobs
+
+Uploads are accepted immediately and processed by a fixed number of
+background workers, so clients on slow links poll for the result instead
+of holding a connection open for the whole inference. The queue is
+bounded; when it is full new submissions are rejected and the client is
+told when to retry. Queued images are held in memory, so together with the
+upload limit (METER_MAX_UPLOAD_BYTES) METER_JOBS_MAX_QUEUE bounds that
+memory.
+
+Jobs live in the API worker process that accepted them. With several
+uvicorn workers, polls must reach the same worker (run a single worker or
+route /api/meter/jobs stickily); each job id names its worker, so a poll
+that lands elsewhere gets a clear JobWorkerMismatchError instead of a 404.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config import METER_JOBS_WORKERS, METER_JOBS_MAX_QUEUE, METER_JOBS_RESULT_TTL
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when the job queue already holds its maximum number of jobs"""
+
+
+class JobWorkerMismatchError(LookupError):
+    """Raised when a job id was issued by another API worker process"""
+
+
+@dataclass
+class MeterJob:
+    id: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    image_bytes: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+
+class MeterJobQueue:
+    """Bounded in-process job queue drained by a fixed pool of async workers"""
+
+    def __init__(
+        self,
+        predict: Callable[[bytes], Awaitable[Dict[str, Any]]],
+        workers: int = METER_JOBS_WORKERS,
+        max_queue: int = METER_JOBS_MAX_QUEUE,
+        result_ttl: float = METER_JOBS_RESULT_TTL
+    ):
+        self.predict = predict
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, MeterJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._durations: List[float] = []
+        # Prefix of every job id this process issues
+        self.worker_id = uuid.uuid4().hex[:8]
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self):
+        """Start the workers (must be called from the event loop)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        logger.info(f"Started meter job queue: workers={self.workers}, max_queue={self.max_queue}")
+
+    async def stop(self):
+        """Stop the workers; jobs still queued are marked failed"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._queue is not None and not self._queue.empty():
+            self._finish(self._queue.get_nowait(), error="Meter job queue stopped")
+
+    def submit(self, image_bytes: bytes) -> MeterJob:
+        """
+        Queue an image for prediction
+
+        Raises:
+            JobQueueFullError: if max_queue jobs are already waiting
+        """
+        if not self._tasks:
+            self.start()
+        self._purge_expired()
+
+        job = MeterJob(id=f"{self.worker_id}-{uuid.uuid4().hex}", image_bytes=image_bytes)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError(f"Meter job queue is full ({self.max_queue} waiting)")
+
+        self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[MeterJob]:
+        """
+        Job by id, None if unknown or expired
+
+        Raises:
+            JobWorkerMismatchError: if the id was issued by another worker
+        """
+        worker_id, _, _ = job_id.rpartition("-")
+        if worker_id and worker_id != self.worker_id:
+            raise JobWorkerMismatchError(
+                f"Job {job_id} belongs to API worker {worker_id}, not {self.worker_id}; "
+                f"the jobs API needs a single worker or sticky routing"
+            )
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up, for Retry-After"""
+        if not self._durations:
+            return 1
+        mean = sum(self._durations) / len(self._durations)
+        return max(1, round(mean * self.depth / self.workers))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "worker_id": self.worker_id,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self.depth,
+            "tracked": len(self._jobs)
+        }
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                result = await self.predict(job.image_bytes)
+            except asyncio.CancelledError:
+                self._finish(job, error="Meter job queue stopped")
+                raise
+            except Exception as e:
+                logger.warning(f"Meter job {job.id} failed: {e}")
+                self._finish(job, error=str(e))
+            else:
+                self._finish(job, result=result)
+
+    def _finish(self, job: MeterJob, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        job.status = FAILED if error else SUCCEEDED
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        job.image_bytes = None
+        if job.started_at is not None:
+            # Recent processing times drive the Retry-After estimate
+            self._durations = (self._durations + [job.finished_at - job.started_at])[-50:]
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,126 @@
+"""
+Vectorized decoding of meter digit detections
+
+Pulls boxes, confidences and classes out of a YOLO result in one transfer,
+then works on NumPy arrays: maps coordinates back to the original photo,
+drops overlapping duplicate digits, groups boxes into rows (two-line
+meters) and orders them for reading.
+"""
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import METER_DUPLICATE_IOU
+from services.meter_preprocess import Letterbox
+
+# Boxes whose vertical centers are further apart than this fraction of the
+# median digit height start a new row
+ROW_GAP_RATIO = 0.6
+
+# A meter reading: digits with at most one decimal point between them
+READING_PATTERN = re.compile(r"\d+(?:\.\d+)?", re.ASCII)
+
+
+def _suppress_duplicates(xyxy: np.ndarray, conf: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Class-agnostic NMS: indices of boxes kept, highest confidence first"""
+    order = np.argsort(-conf)
+    xyxy = xyxy[order]
+
+    x1, y1, x2, y2 = xyxy.T
+    area = (x2 - x1) * (y2 - y1)
+    ix1 = np.maximum(x1[:, None], x1[None, :])
+    iy1 = np.maximum(y1[:, None], y1[None, :])
+    ix2 = np.minimum(x2[:, None], x2[None, :])
+    iy2 = np.minimum(y2[:, None], y2[None, :])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    iou = inter / np.maximum(area[:, None] + area[None, :] - inter, 1e-9)
+
+    keep = np.ones(len(order), dtype=bool)
+    for i in range(len(order)):
+        if keep[i]:
+            # Anything lower-ranked that overlaps a kept box is a duplicate
+            keep[i + 1:] &= iou[i, i + 1:] <= iou_threshold
+    return order[keep]
+
+
+def _assign_rows(xyxy: np.ndarray) -> np.ndarray:
+    """Row index per box, 0 for the top row"""
+    centers = (xyxy[:, 1] + xyxy[:, 3]) / 2
+    heights = xyxy[:, 3] - xyxy[:, 1]
+    order = np.argsort(centers)
+
+    gap = ROW_GAP_RATIO * max(float(np.median(heights)), 1.0)
+    new_row = np.concatenate(([0], np.diff(centers[order]) > gap))
+
+    rows = np.empty(len(xyxy), dtype=np.int64)
+    rows[order] = np.cumsum(new_row)
+    return rows
+
+
+def parse_reading(digits: str) -> Optional[float]:
+    """
+    Numeric value of a row of digit labels, or None if it is not a well-formed
+    reading (e.g. "12.3.4" or a stray non-digit label), so a misread is never
+    turned into a plausible-looking number
+    """
+    if not READING_PATTERN.fullmatch(digits):
+        return None
+    return float(digits)
+
+
+def decode_detections(
+    r,
+    names: Dict[int, str],
+    letterbox: Letterbox,
+    iou_threshold: float = METER_DUPLICATE_IOU
+) -> Dict[str, Any]:
+    """
+    Turn one YOLO result into the meter reading response
+
+    Returns:
+        Dict with 'text' (labels in reading order), 'detections' (label, x,
+        conf and row of each kept box, original-image pixels), 'rows' (digit
+        string per row, top to bottom), 'reading' (numeric value of the top
+        row) and 'confidence' (mean confidence of the kept boxes)
+    """
+    # Single device-to-host transfer: x1, y1, x2, y2, conf, cls
+    data = r.boxes.data.cpu().numpy() if len(r.boxes) else np.empty((0, 6), dtype=np.float32)
+
+    if len(data) == 0:
+        return {"text": "", "detections": [], "rows": [], "reading": None, "confidence": 0.0}
+
+    xyxy = data[:, :4].astype(np.float64)
+    conf = data[:, 4]
+    cls = data[:, 5].astype(np.int64)
+
+    xyxy[:, [0, 2]] = letterbox.to_original_x(xyxy[:, [0, 2]])
+    xyxy[:, [1, 3]] = letterbox.to_original_y(xyxy[:, [1, 3]])
+
+    keep = _suppress_duplicates(xyxy, conf, iou_threshold)
+    xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+
+    rows = _assign_rows(xyxy)
+    # Reading order: rows top to bottom, then left to right
+    order = np.lexsort((xyxy[:, 0], rows))
+    xs, conf, cls, rows = xyxy[order, 0].tolist(), conf[order].tolist(), cls[order].tolist(), rows[order].tolist()
+
+    labels = [names[c] for c in cls]
+    detections = [
+        {"label": label, "x": x, "conf": c, "row": row}
+        for label, x, c, row in zip(labels, xs, conf, rows)
+    ]
+
+    row_texts: List[str] = []
+    for label, row in zip(labels, rows):
+        if row == len(row_texts):
+            row_texts.append("")
+        row_texts[row] += label
+
+    return {
+        "text": " ".join(labels),
+        "detections": detections,
+        "rows": row_texts,
+        "reading": parse_reading(row_texts[0]),
+        "confidence": float(np.mean(conf))
+    }
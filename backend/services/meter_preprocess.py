@@ -0,0 +1,202 @@
+"""
+Image preprocessing for the meter reading model
+
+Phone photos are often 12 MP while the model only sees 640x640. Instead of
+decoding to full-resolution BGR and converting color twice, the image is
+decoded straight to grayscale at a reduced scale (libjpeg can skip most of
+the work), then letterboxed to the model input into a preallocated buffer.
+"""
+import struct
+import threading
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import METER_BATCH_MAX_SIZE
+
+# ultralytics pads letterboxed images with this gray value
+PAD_VALUE = 114
+
+# Reduction factor -> OpenCV flag for a grayscale decode at that scale
+_REDUCED_GRAYSCALE = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+class ImageDecodeError(ValueError):
+    """Raised when uploaded bytes are not a decodable image"""
+
+
+@dataclass
+class Letterbox:
+    """Maps model-input coordinates back to the original image"""
+    scale: float  # model pixels per original pixel
+    pad_x: int
+    pad_y: int
+    offset_x: float = 0.0  # crop origin in original pixels
+    offset_y: float = 0.0
+
+    def to_original_x(self, x: float) -> float:
+        return (x - self.pad_x) / self.scale + self.offset_x
+
+    def to_original_y(self, y: float) -> float:
+        return (y - self.pad_y) / self.scale + self.offset_y
+
+
+def peek_image_size(image_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from a JPEG or PNG header without decoding"""
+    if image_bytes[:8] == b"\x89PNG\r\n\x1a\n" and len(image_bytes) >= 24:
+        width, height = struct.unpack(">II", image_bytes[16:24])
+        return width, height
+
+    if image_bytes[:2] != b"\xff\xd8":
+        return None
+
+    # Walk JPEG markers until a start-of-frame segment
+    pos = 2
+    size = len(image_bytes)
+    while pos + 9 < size:
+        if image_bytes[pos] != 0xFF:
+            return None
+        marker = image_bytes[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        segment_length = struct.unpack(">H", image_bytes[pos + 2:pos + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", image_bytes[pos + 5:pos + 9])
+            return width, height
+        pos += 2 + segment_length
+
+    return None
+
+
+def reduction_factor(image_size: Optional[Tuple[int, int]], target: int) -> int:
+    """Largest decode reduction that keeps the long side at or above target"""
+    if not image_size:
+        return 1
+    long_side = max(image_size)
+    for factor in (8, 4, 2):
+        if long_side // factor >= target:
+            return factor
+    return 1
+
+
+class MeterPreprocessor:
+    """
+    Decodes and letterboxes meter photos into reusable model-input buffers
+
+    Buffers are per thread, so concurrent batches never share one: the
+    grayscale canvas belongs to the thread doing the letterboxing, and the
+    RGB model inputs to the thread that owns the batch (batch_buffers).
+    Only the first max_slots inputs of a batch are pooled.
+    """
+
+    def __init__(self, imgsz: int = 640, max_slots: int = METER_BATCH_MAX_SIZE):
+        self.imgsz = imgsz
+        self.max_slots = max(1, max_slots)
+        self._local = threading.local()
+
+    def _canvas(self) -> np.ndarray:
+        canvas = getattr(self._local, "canvas", None)
+        if canvas is None:
+            canvas = self._local.canvas = np.empty((self.imgsz, self.imgsz), dtype=np.uint8)
+        return canvas
+
+    def batch_buffers(self, count: int) -> List[Optional[np.ndarray]]:
+        """
+        RGB model-input buffers of the calling thread for a batch of count
+
+        Entries past max_slots are None; letterbox allocates those inputs.
+        The buffers are reused by the thread's next batch.
+        """
+        buffers = getattr(self._local, "rgb", None)
+        if buffers is None:
+            buffers = self._local.rgb = []
+        while len(buffers) < min(count, self.max_slots):
+            buffers.append(np.empty((self.imgsz, self.imgsz, 3), dtype=np.uint8))
+        return buffers[:count] + [None] * max(0, count - len(buffers))
+
+    def decode(self, image_bytes: bytes) -> Tuple[np.ndarray, int]:
+        """
+        Decode to grayscale at the coarsest scale that still covers imgsz
+
+        Returns:
+            Grayscale image and the reduction factor it was decoded at
+        """
+        factor = reduction_factor(peek_image_size(image_bytes), self.imgsz)
+        gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), _REDUCED_GRAYSCALE[factor])
+
+        if gray is None:
+            raise ImageDecodeError("Failed to decode image")
+
+        return gray, factor
+
+    def letterbox(
+        self,
+        gray: np.ndarray,
+        factor: int,
+        out: Optional[np.ndarray] = None,
+        origin: Tuple[int, int] = (0, 0)
+    ) -> Tuple[np.ndarray, Letterbox]:
+        """
+        Resize and pad a decoded image into out, an RGB buffer from
+        batch_buffers, or a new array when out is None
+
+        origin is the (x, y) of gray inside the decoded image when gray is a
+        crop.
+        """
+        canvas = self._canvas()
+        rgb = out if out is not None else np.empty((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+
+        h, w = gray.shape[:2]
+        scale = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = round(w * scale), round(h * scale)
+        pad_x = (self.imgsz - new_w) // 2
+        pad_y = (self.imgsz - new_h) // 2
+
+        canvas.fill(PAD_VALUE)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+            gray, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+        )
+        # Single color conversion, written straight into the model buffer
+        cv2.cvtColor(canvas, cv2.COLOR_GRAY2RGB, dst=rgb)
+
+        return rgb, Letterbox(
+            scale=scale / factor,
+            pad_x=pad_x,
+            pad_y=pad_y,
+            offset_x=origin[0] * factor,
+            offset_y=origin[1] * factor
+        )
+
+    @staticmethod
+    def crop(
+        gray: np.ndarray,
+        box: Tuple[float, float, float, float],
+        margin: float = 0.0
+    ) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Cut a box (x1, y1, x2, y2 in decoded pixels) out of a decoded image
+
+        The box is grown by margin times its size on each side.
+
+        Returns:
+            The crop (a view, not a copy) and its (x, y) origin
+        """
+        h, w = gray.shape[:2]
+        x1, y1, x2, y2 = box
+        dx, dy = (x2 - x1) * margin, (y2 - y1) * margin
+        left, top = max(0, int(x1 - dx)), max(0, int(y1 - dy))
+        right, bottom = min(w, int(np.ceil(x2 + dx))), min(h, int(np.ceil(y2 + dy)))
+        return gray[top:bottom, left:right], (left, top)
+
+    def prepare(self, image_bytes: bytes) -> Tuple[np.ndarray, Letterbox]:
+        """Decode and letterbox one image into a new model input"""
+        gray, factor = self.decode(image_bytes)
+        return self.letterbox(gray, factor)
@@ -0,0 +1,238 @@
+"""
+Post-training INT8 quantization for the meter digit detector
+
+Builds an INT8 version of an exported engine, calibrated on a local folder of
+sample meter photos, and gates it on digit-string accuracy against the FP32
+model. A quantized model that loses more than the allowed accuracy is
+refused and the FP32 engine is served instead.
+
+The accuracy gate runs on photos the quantizer never saw: the folder in
+METER_INT8_EVAL_DIR, or else every HOLDOUT_EVERY-th calibration photo, which
+is then left out of calibration. If the evaluation folder contains a
+labels.json mapping file names to the true digit string, accuracy is
+measured against those labels; otherwise the FP32 model's output is used as
+the reference.
+"""
+import json
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    METER_INT8_CALIBRATION_DIR, METER_INT8_EVAL_DIR, METER_INT8_MAX_ACCURACY_DROP,
+    METER_INT8_MAX_CALIBRATION_IMAGES
+)
+from services.meter_engines import list_fixture_images
+from services.meter_preprocess import ImageDecodeError, MeterPreprocessor
+
+logger = logging.getLogger(__name__)
+
+CALIBRATION_IMGSZ = 640
+LABELS_FILE = "labels.json"
+HOLDOUT_EVERY = 5
+
+
+def split_images(
+    calibration_dir: str,
+    eval_dir: str = METER_INT8_EVAL_DIR,
+    limit: int = METER_INT8_MAX_CALIBRATION_IMAGES
+) -> Tuple[List[Path], List[Path], Path]:
+    """
+    Disjoint calibration and evaluation photo lists
+
+    Returns:
+        Calibration images, evaluation images and the folder whose
+        labels.json (if any) labels the evaluation images
+    """
+    images = list_fixture_images(calibration_dir)
+    if eval_dir:
+        if Path(eval_dir).resolve() == Path(calibration_dir).resolve():
+            raise ValueError("METER_INT8_EVAL_DIR must not be the calibration folder")
+        calibration, evaluation, labels_dir = images, list_fixture_images(eval_dir), Path(eval_dir)
+    else:
+        evaluation = images[::HOLDOUT_EVERY]
+        calibration = [p for i, p in enumerate(images) if i % HOLDOUT_EVERY]
+        labels_dir = Path(calibration_dir)
+
+    if not calibration or not evaluation:
+        raise ValueError(
+            f"INT8 quantization needs calibration and held-out evaluation photos; "
+            f"found {len(calibration)} and {len(evaluation)}"
+        )
+    return calibration[:limit], evaluation[:limit], labels_dir
+
+
+def _calibration_tensors(images: List[Path]) -> Iterator[np.ndarray]:
+    """Yield NCHW float32 tensors preprocessed the way MeterReadingService feeds YOLO"""
+    preprocessor = MeterPreprocessor(CALIBRATION_IMGSZ)
+    for image_path in images:
+        try:
+            rgb, _ = preprocessor.prepare(image_path.read_bytes())
+        except ImageDecodeError:
+            continue
+        # HWC uint8 -> NCHW in [0, 1], as ultralytics does before inference
+        yield (rgb.transpose(2, 0, 1).astype(np.float32) / 255.0)[None]
+
+
+def _quantize_onnx(fp32_path: str, images: List[Path], target: Path):
+    import onnxruntime
+    from onnxruntime.quantization import (
+        CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    )
+
+    input_name = onnxruntime.InferenceSession(
+        fp32_path, providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    class _Reader(CalibrationDataReader):
+        def __init__(self):
+            self._tensors = _calibration_tensors(images)
+
+        def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+            tensor = next(self._tensors, None)
+            return None if tensor is None else {input_name: tensor}
+
+    quantize_static(
+        fp32_path,
+        str(target),
+        _Reader(),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+
+def _quantize_openvino(model_path: str, images: List[Path], target: Path):
+    import yaml
+    from ultralytics import YOLO
+
+    model = YOLO(model_path)
+    with tempfile.TemporaryDirectory() as tmp:
+        # ultralytics calibrates from a dataset yaml; point both splits at a
+        # list of the calibration photos so held-out ones stay unseen
+        image_list = Path(tmp) / "calibration.txt"
+        image_list.write_text("\n".join(str(p.resolve()) for p in images) + "\n")
+        data_yaml = Path(tmp) / "calibration.yaml"
+        data_yaml.write_text(yaml.safe_dump({
+            "path": tmp,
+            "train": str(image_list),
+            "val": str(image_list),
+            "names": model.names
+        }))
+        exported = model.export(
+            format="openvino", int8=True, dynamic=True, data=str(data_yaml)
+        )
+
+    shutil.move(str(exported), str(target))
+
+
+def _predict_texts(service, images: List[Path]) -> Dict[str, str]:
+    predictions = {}
+    for image_path in images:
+        try:
+            predictions[image_path.name] = service.predict(image_path.read_bytes())["text"]
+        except ValueError:
+            continue
+    return predictions
+
+
+def evaluate_accuracy_drop(
+    fp32_service,
+    int8_service,
+    images: List[Path],
+    labels_dir: Path
+) -> Dict[str, Any]:
+    """
+    Compare digit-string accuracy of FP32 and INT8 services on images
+
+    images must not have been used for calibration.
+
+    Returns:
+        Report with both accuracies and the drop (fp32 - int8)
+    """
+    labels_path = labels_dir / LABELS_FILE
+    truth = json.loads(labels_path.read_text(encoding="utf-8")) if labels_path.exists() else None
+
+    fp32 = _predict_texts(fp32_service, images)
+    int8 = _predict_texts(int8_service, images)
+
+    def compact(text: str) -> str:
+        return text.replace(" ", "")
+
+    if truth:
+        names = [n for n in fp32 if n in truth]
+        reference = {n: compact(truth[n]) for n in names}
+        fp32_accuracy = sum(compact(fp32[n]) == reference[n] for n in names) / max(len(names), 1)
+    else:
+        # No labels: FP32 output is the reference, so its accuracy is 1 by definition
+        names = list(fp32)
+        reference = {n: compact(fp32[n]) for n in names}
+        fp32_accuracy = 1.0
+
+    int8_accuracy = sum(compact(int8.get(n, "")) == reference[n] for n in names) / max(len(names), 1)
+
+    return {
+        "images": len(names),
+        "reference": "labels" if truth else "fp32",
+        "fp32_accuracy": fp32_accuracy,
+        "int8_accuracy": int8_accuracy,
+        "accuracy_drop": fp32_accuracy - int8_accuracy
+    }
+
+
+def quantize_engine(
+    model_path: str,
+    engine: str,
+    fp32_path: str,
+    target: Path,
+    calibration_dir: str = METER_INT8_CALIBRATION_DIR,
+    max_accuracy_drop: float = METER_INT8_MAX_ACCURACY_DROP,
+    limit: int = METER_INT8_MAX_CALIBRATION_IMAGES,
+    eval_dir: str = METER_INT8_EVAL_DIR
+) -> Dict[str, Any]:
+    """
+    Build an INT8 artifact at target and check it against the FP32 engine
+
+    Returns:
+        Accuracy report, with 'passed' set when the drop is within budget
+    """
+    if not calibration_dir or not Path(calibration_dir).is_dir():
+        raise ValueError("INT8 mode requires METER_INT8_CALIBRATION_DIR to be an existing folder")
+    if eval_dir and not Path(eval_dir).is_dir():
+        raise ValueError("METER_INT8_EVAL_DIR must be an existing folder")
+
+    calibration, evaluation, labels_dir = split_images(calibration_dir, eval_dir, limit)
+    logger.info(
+        f"Quantizing {engine} meter model to INT8 on {len(calibration)} photos from "
+        f"{calibration_dir}, evaluating on {len(evaluation)} held-out photos..."
+    )
+    if engine == "onnx":
+        _quantize_onnx(fp32_path, calibration, target)
+    elif engine == "openvino":
+        _quantize_openvino(model_path, calibration, target)
+    else:
+        raise ValueError(f"INT8 quantization is not supported for engine '{engine}'")
+
+    from services.meter_service import MeterReadingService
+
+    # engine="torch" loads a path as given, here the exported artifacts themselves
+    report = evaluate_accuracy_drop(
+        MeterReadingService(fp32_path, engine="torch", int8=False),
+        MeterReadingService(str(target), engine="torch", int8=False),
+        evaluation,
+        labels_dir
+    )
+    report["max_accuracy_drop"] = max_accuracy_drop
+    report["passed"] = report["accuracy_drop"] <= max_accuracy_drop
+
+    logger.info(
+        f"INT8 accuracy gate: fp32={report['fp32_accuracy']:.3f}, "
+        f"int8={report['int8_accuracy']:.3f} over {report['images']} held-out images "
+        f"({'passed' if report['passed'] else 'rejected'})"
+    )
+    return report
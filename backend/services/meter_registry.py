@@ -0,0 +1,205 @@
+"""
+Hot-swappable meter model registry
+
+Holds the executor serving the active model version and the one it
+replaced. A new version is loaded and warmed up in the background while
+the active one keeps serving; traffic then moves over in a single
+assignment on the event loop, and the previous version stays loaded so a
+rollback is instant.
+
+The registry has the executor interface, so the micro-batcher, job queue
+and result cache follow the active version without knowing about swaps
+(cache keys include the model version). Each API worker process has its
+own registry; with several workers, send the swap to each of them.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from config import METER_MODEL_DIR
+from services.inference_executor import create_meter_executor
+from services.metrics import set_active_meter_model
+
+logger = logging.getLogger(__name__)
+
+
+class ModelSwapError(RuntimeError):
+    """Raised when a model load or rollback cannot be started"""
+
+
+class InvalidModelError(ModelSwapError):
+    """Raised when a requested model is not a file inside the model directory"""
+
+
+class MeterModelRegistry:
+    """Active and previous meter model executors, swappable at runtime"""
+
+    def __init__(self, factory: Callable[..., Any] = create_meter_executor, model_dir: str = METER_MODEL_DIR):
+        self._factory = factory
+        self.model_dir = model_dir
+        self.active = factory()
+        self.previous = None
+        self._loading: Optional[asyncio.Task] = None
+        self.last_load: Dict[str, Any] = {"state": "idle"}
+
+    # Executor interface, delegated to the active version
+    @property
+    def model_path(self) -> str:
+        return self.active.model_path
+
+    @property
+    def engine(self) -> str:
+        return self.active.engine
+
+    @property
+    def int8(self) -> bool:
+        return self.active.int8
+
+    @property
+    def kind(self) -> str:
+        return self.active.kind
+
+    @property
+    def max_workers(self) -> int:
+        return self.active.max_workers
+
+    @property
+    def max_queue(self) -> int:
+        return self.active.max_queue
+
+    @property
+    def model_version(self) -> str:
+        return self.active.model_version
+
+    @property
+    def pending(self) -> int:
+        return self.active.pending + (self.previous.pending if self.previous is not None else 0)
+
+    def start(self):
+        self.active.start()
+
+    async def warmup(self):
+        await self.active.warmup()
+        set_active_meter_model(self.active.model_version)
+
+    def shutdown(self, wait: bool = True):
+        if self._loading is not None:
+            self._loading.cancel()
+        for executor in (self.active, self.previous):
+            if executor is not None:
+                executor.shutdown(wait=wait)
+
+    async def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+        return await self.active.predict(image_bytes)
+
+    async def predict_batch(self, images: List[bytes]) -> List[Union[Dict[str, Any], Exception]]:
+        return await self.active.predict_batch(images)
+
+    # Version management
+    @property
+    def loading(self) -> bool:
+        return self._loading is not None and not self._loading.done()
+
+    def resolve_model(self, model_name: str) -> str:
+        """
+        Path of a model file inside model_dir
+
+        Model files are pickles, so loading one runs code: only files an
+        operator placed in model_dir are accepted.
+
+        Raises:
+            InvalidModelError: for absolute paths, '..' segments, paths
+                leaving model_dir (e.g. through symlinks) and missing files
+        """
+        if not model_name or os.path.isabs(model_name) or ".." in model_name.replace("\\", "/").split("/"):
+            raise InvalidModelError(f"Invalid model name: {model_name!r}; give a file name inside {self.model_dir}")
+
+        root = os.path.realpath(self.model_dir)
+        model_path = os.path.realpath(os.path.join(root, model_name))
+        if os.path.commonpath([root, model_path]) != root:
+            raise InvalidModelError(f"Model {model_name!r} resolves outside {self.model_dir}")
+        if not os.path.isfile(model_path):
+            raise InvalidModelError(f"Model file not found in {self.model_dir}: {model_name}")
+        return model_path
+
+    def load(self, model_name: str):
+        """
+        Start loading and warming up a model from model_dir in the background
+
+        Must be called from the event loop. Traffic switches over only once
+        every worker of the new version has been warmed up.
+
+        Raises:
+            InvalidModelError: if the name is not a file inside model_dir
+            ModelSwapError: if a load is already running or models are served
+                by the shared sidecar
+        """
+        if self.active.kind == "sidecar":
+            raise ModelSwapError("Models are served by the meter sidecar; restart it with the new model")
+        if self.loading:
+            raise ModelSwapError(f"Already loading {self.last_load['model_path']}")
+        model_path = self.resolve_model(model_name)
+
+        self.last_load = {"state": "loading", "model_path": model_path, "started_at": time.time()}
+        self._loading = asyncio.create_task(self._load(model_path))
+
+    def rollback(self) -> str:
+        """
+        Switch back to the previous version; returns the now active version
+
+        Raises:
+            ModelSwapError: if there is no previous version or a load is running
+        """
+        if self.previous is None:
+            raise ModelSwapError("No previous model version to roll back to")
+        if self.loading:
+            raise ModelSwapError("Cannot roll back while a new model version is loading")
+
+        self.active, self.previous = self.previous, self.active
+        set_active_meter_model(self.active.model_version)
+        logger.warning(
+            f"Rolled meter model back to {self.active.model_version} "
+            f"(from {self.previous.model_version})"
+        )
+        return self.active.model_version
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "active": {"model_path": self.active.model_path, "model_version": self.active.model_version},
+            "previous": (
+                {"model_path": self.previous.model_path, "model_version": self.previous.model_version}
+                if self.previous is not None else None
+            ),
+            "last_load": self.last_load
+        }
+
+    async def _load(self, model_path: str):
+        candidate = self._factory(model_path=model_path)
+        try:
+            candidate.start()
+            await candidate.warmup()
+        except asyncio.CancelledError:
+            candidate.shutdown(wait=False)
+            raise
+        except Exception as e:
+            logger.error(f"Failed to load meter model {model_path}: {e}", exc_info=True)
+            candidate.shutdown(wait=False)
+            self.last_load.update(state="failed", error=str(e), finished_at=time.time())
+            return
+
+        # Single assignment on the event loop: new requests go to the
+        # candidate, requests already running finish on the old executor
+        retired, self.previous, self.active = self.previous, self.active, candidate
+        if retired is not None:
+            retired.shutdown(wait=False)
+
+        set_active_meter_model(candidate.model_version)
+        self.last_load.update(
+            state="active", model_version=candidate.model_version, finished_at=time.time()
+        )
+        logger.info(
+            f"Switched meter model to {candidate.model_version} "
+            f"(previous {self.previous.model_version} kept for rollback)"
+        )
@@ -1,74 +1,315 @@
 """
 Meter Reading Service using YOLO
 """
-import cv2
+import time
 import numpy as np
-from ultralytics import YOLO
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 import logging
 
+from config import (
+    METER_DECODE_THREADS, METER_ENGINE, METER_INT8, METER_IMGSZ,
+    METER_DISPLAY_MODEL_PATH, METER_DISPLAY_IMGSZ, METER_CROP_IMGSZ,
+    METER_DISPLAY_CROP_MARGIN, METER_IMGSZ_LADDER, METER_ADAPTIVE_MIN_CONFIDENCE
+)
+from services.meter_engines import is_int8_artifact, resolve_model_path
+from services.meter_preprocess import MeterPreprocessor, Letterbox
+from services.meter_postprocess import decode_detections
+
 logger = logging.getLogger(__name__)
 
+# Display crops smaller than this (in decoded pixels) are ignored
+MIN_CROP_SIZE = 8
+
+# Pipeline stages reported in each result's 'timings'
+STAGES = ("decode", "preprocess", "inference", "postprocess")
+
+
+@contextmanager
+def _timed(timings: Dict[str, float], stage: str):
+    """Add the wall time of the block to timings[stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] += time.perf_counter() - start
+
 
 class MeterReadingService:
     """Service class for meter reading using YOLO model"""
-    
-    def __init__(self, model_path: str = "best.pt"):
-        """Initialize YOLO model"""
-        self.model = YOLO(model_path)
-        logger.info(f"Loaded YOLO model from {model_path}")
-    
-    async def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+
+    def __init__(
+        self,
+        model_path: str = "best.pt",
+        engine: str = METER_ENGINE,
+        int8: bool = METER_INT8,
+        imgsz: int = METER_IMGSZ,
+        decode_threads: int = METER_DECODE_THREADS,
+        display_model_path: str = METER_DISPLAY_MODEL_PATH,
+        display_imgsz: int = METER_DISPLAY_IMGSZ,
+        crop_imgsz: int = METER_CROP_IMGSZ,
+        display_crop_margin: float = METER_DISPLAY_CROP_MARGIN,
+        imgsz_ladder: Optional[Sequence[int]] = METER_IMGSZ_LADDER,
+        min_confidence: float = METER_ADAPTIVE_MIN_CONFIDENCE
+    ):
+        """
+        Initialize YOLO model on the configured inference engine
+
+        With int8 set, a quantized model is served if it passes its accuracy
+        gate against FP32; otherwise the FP32 engine is used. self.int8 tells
+        which one was loaded.
+
+        With display_model_path set, reading runs in two stages: a light
+        model finds the meter display window at display_imgsz, then the
+        digit model reads only that crop at crop_imgsz.
+
+        With imgsz_ladder set, full frames are read at the smallest size
+        first and only images whose mean confidence is below min_confidence
+        are retried at the next size up; imgsz is then ignored.
+        """
+        # Imported here so processes that only talk to an inference sidecar
+        # never load torch
+        from ultralytics import YOLO
+
+        self.model_path = model_path
+        self.engine = engine
+        model_file = resolve_model_path(model_path, engine, int8=int8)
+        self.int8 = is_int8_artifact(model_file)
+        self.model = YOLO(model_file, task="detect")
+        # Images are decoded for the largest size they may be read at
+        ladder = sorted(set(imgsz_ladder or ())) or [imgsz]
+        self.imgsz = ladder[-1]
+        self.preprocessor = MeterPreprocessor(self.imgsz)
+        self.ladder = [MeterPreprocessor(size) for size in ladder[:-1]] + [self.preprocessor]
+        self.min_confidence = min_confidence
+
+        self.display_model = None
+        if display_model_path:
+            self.display_model = YOLO(resolve_model_path(display_model_path, engine, int8=False), task="detect")
+            self.display_imgsz = display_imgsz
+            self.display_crop_margin = display_crop_margin
+            self.display_preprocessor = MeterPreprocessor(display_imgsz)
+            self.crop_preprocessor = MeterPreprocessor(crop_imgsz)
+            logger.info(f"Loaded display-region model from {display_model_path}")
+
+        # OpenCV releases the GIL while decoding, so a small pool decodes
+        # batch members in parallel
+        self._decode_pool = ThreadPoolExecutor(max_workers=max(1, decode_threads))
+        logger.info(f"Loaded YOLO model from {model_path} (engine: {engine})")
+
+    def warmup(self) -> float:
+        """
+        Run one inference on a blank input for every model this service uses
+
+        Returns:
+            Elapsed time in seconds
+        """
+        start = time.perf_counter()
+        for preprocessor in self.ladder:
+            size = preprocessor.imgsz
+            blank = np.full((size, size, 3), 114, dtype=np.uint8)
+            self.model.predict([blank], imgsz=size, verbose=False)
+        if self.display_model is not None:
+            blank = np.full((self.display_imgsz, self.display_imgsz, 3), 114, dtype=np.uint8)
+            self.display_model.predict([blank], imgsz=self.display_imgsz, verbose=False)
+            crop_blank = np.full((self.crop_preprocessor.imgsz,) * 2 + (3,), 114, dtype=np.uint8)
+            self.model.predict([crop_blank], imgsz=self.crop_preprocessor.imgsz, verbose=False)
+        return time.perf_counter() - start
+
+    def predict(self, image_bytes: bytes) -> Dict[str, Any]:
         """
         Predict meter reading from image
-        
+
+        This call is CPU-bound and blocking; async callers should go through
+        MeterInferenceExecutor instead of calling it on the event loop.
+
         Args:
             image_bytes: Image data as bytes
-            
+
         Returns:
             Dict with 'text' (predicted reading) and 'detections' (detailed results)
         """
+        result = self.predict_batch([image_bytes])[0]
+        if isinstance(result, Exception):
+            logger.error(f"Error in meter prediction: {str(result)}")
+            raise result
+        return result
+
+    def predict_batch(self, images: List[bytes]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Predict meter readings for several images with a single model call
+
+        Args:
+            images: List of image data as bytes
+
+        Returns:
+            One entry per input image, in order: either a result dict (same
+            shape as predict) or the exception raised while processing it.
+            Result dicts carry 'timings': seconds spent by the batch in each
+            of STAGES, plus 'batch_size'.
+        """
+        results: List[Union[Dict[str, Any], Exception]] = [None] * len(images)
+        timings = dict.fromkeys(STAGES, 0.0)
+
+        # Decode images in parallel; failures are reported per image
+        with _timed(timings, "decode"):
+            decoded = self._map(self._safe_decode, images)
+        valid = []
+        for idx, item in enumerate(decoded):
+            if isinstance(item, Exception):
+                results[idx] = item
+            else:
+                valid.append(idx)
+
+        if not valid:
+            return results
+
+        # Two-stage mode: find the display window first, then read digits on the crop
+        regions: Dict[int, Tuple[float, float, float, float]] = {}
+        if self.display_model is not None:
+            regions = self._locate_displays(valid, decoded, timings)
+
+        crops = []
+        frames = []
+        for idx in valid:
+            gray, factor = decoded[idx]
+            if idx in regions:
+                crop, origin = MeterPreprocessor.crop(gray, regions[idx], self.display_crop_margin)
+                if min(crop.shape[:2]) >= MIN_CROP_SIZE:
+                    crops.append((idx, crop, factor, origin))
+                    continue
+            frames.append((idx, gray, factor, (0, 0)))
+
+        if crops:
+            self._detect_digits(crops, self.crop_preprocessor, results, timings)
+        self._detect_frames(frames, results, timings)
+
+        for result in results:
+            if isinstance(result, dict):
+                result["timings"] = dict(timings, batch_size=len(images))
+
+        return results
+
+    def _map(self, fn, *iterables) -> list:
+        """Run fn over the inputs, on the decode pool when there is more than one"""
+        if len(iterables[0]) > 1:
+            return list(self._decode_pool.map(fn, *iterables))
+        return list(map(fn, *iterables))
+
+    def _safe_decode(self, image_bytes: bytes) -> Union[Tuple[np.ndarray, int], Exception]:
+        try:
+            return self.preprocessor.decode(image_bytes)
+        except Exception as e:
+            return e
+
+    def _locate_displays(
+        self,
+        indices: List[int],
+        decoded: List[Tuple[np.ndarray, int]],
+        timings: Dict[str, float]
+    ) -> Dict[int, Tuple[float, float, float, float]]:
+        """
+        Run the display-region model and return the most confident display
+        box per image, in decoded-image pixels. Images without a detected
+        display are left out and fall back to full-frame digit detection.
+        """
+        with _timed(timings, "preprocess"):
+            prepared = self._map(
+                lambda idx, out: self.display_preprocessor.letterbox(*decoded[idx], out),
+                indices, self.display_preprocessor.batch_buffers(len(indices))
+            )
+
+        try:
+            with _timed(timings, "inference"):
+                predictions = self.display_model.predict(
+                    [rgb for rgb, _ in prepared], imgsz=self.display_imgsz, verbose=False
+                )
+        except Exception as e:
+            logger.warning(f"Display detection failed, reading full frames: {str(e)}")
+            return {}
+
+        regions = {}
+        for idx, (_, letterbox), r in zip(indices, prepared, predictions):
+            if len(r.boxes) == 0:
+                continue
+            factor = decoded[idx][1]
+            x1, y1, x2, y2 = r.boxes.xyxy[int(r.boxes.conf.argmax())].tolist()
+            regions[idx] = (
+                letterbox.to_original_x(x1) / factor,
+                letterbox.to_original_y(y1) / factor,
+                letterbox.to_original_x(x2) / factor,
+                letterbox.to_original_y(y2) / factor
+            )
+        return regions
+
+    def _detect_frames(
+        self,
+        frames: List[Tuple[int, np.ndarray, int, Tuple[int, int]]],
+        results: List[Union[Dict[str, Any], Exception]],
+        timings: Dict[str, float]
+    ):
+        """Full-frame digit detection, moving up the imgsz ladder for unconfident images"""
+        remaining = frames
+        for rung, preprocessor in enumerate(self.ladder):
+            earlier = {idx: results[idx] for idx, *_ in remaining}
+            self._detect_digits(remaining, preprocessor, results, timings)
+
+            # A larger size is not always better; keep the most confident read
+            for idx, previous in earlier.items():
+                current = results[idx]
+                if isinstance(previous, dict) and (
+                    not isinstance(current, dict) or current["confidence"] < previous["confidence"]
+                ):
+                    results[idx] = previous
+
+            if rung == len(self.ladder) - 1:
+                break
+            remaining = [
+                item for item in remaining
+                if not isinstance(results[item[0]], dict)
+                or results[item[0]]["confidence"] < self.min_confidence
+            ]
+            if not remaining:
+                break
+
+    def _detect_digits(
+        self,
+        items: List[Tuple[int, np.ndarray, int, Tuple[int, int]]],
+        preprocessor: MeterPreprocessor,
+        results: List[Union[Dict[str, Any], Exception]],
+        timings: Dict[str, float]
+    ):
+        """Letterbox (index, image, factor, origin) items and run one digit-model batch"""
+        if not items:
+            return
+
+        # Each image gets its own input buffer, owned by this thread
+        with _timed(timings, "preprocess"):
+            prepared = self._map(
+                lambda item, out: preprocessor.letterbox(item[1], item[2], out, item[3]),
+                items, preprocessor.batch_buffers(len(items))
+            )
+
         try:
-            # Decode image
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if img is None:
-                raise ValueError("Failed to decode image")
-            
-            # Preprocess image
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            processed = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
-            
-            # Run YOLO prediction
-            results = self.model.predict(processed)
-            
-            # Extract detections
-            detections = []
-            for r in results:
-                for box in r.boxes:
-                    x1 = float(box.xyxy[0][0])  # X coordinate (left)
-                    label = self.model.names[int(box.cls)]
-                    conf = float(box.conf)
-                    detections.append({
-                        "label": label,
-                        "x": x1,
-                        "conf": conf
-                    })
-            
-            # Sort by X coordinate (left to right)
-            detections = sorted(detections, key=lambda d: d["x"])
-            
-            # Combine labels to form text result
-            text_result = " ".join([d["label"] for d in detections])
-            
-            logger.info(f"Predicted meter reading: {text_result}")
-            
-            return {
-                "text": text_result,
-                "detections": detections
-            }
-            
+            # Run YOLO prediction once for the whole batch
+            with _timed(timings, "inference"):
+                predictions = self.model.predict(
+                    [rgb for rgb, _ in prepared], imgsz=preprocessor.imgsz, verbose=False
+                )
         except Exception as e:
-            logger.error(f"Error in meter prediction: {str(e)}", exc_info=True)
-            raise
+            logger.error(f"Error in batched meter prediction: {str(e)}", exc_info=True)
+            for idx, *_ in items:
+                results[idx] = e
+            return
+
+        with _timed(timings, "postprocess"):
+            for (idx, *_), (_, letterbox), r in zip(items, prepared, predictions):
+                results[idx] = self._postprocess(r, letterbox)
+                results[idx]["imgsz"] = preprocessor.imgsz
+
+    def _postprocess(self, r, letterbox: Letterbox) -> Dict[str, Any]:
+        """Turn one YOLO result into text, parsed reading and ordered detections"""
+        result = decode_detections(r, self.model.names, letterbox)
+        logger.info(f"Predicted meter reading: {result['text']}")
+        return result
@@ -0,0 +1,295 @@
+"""
+Shared meter inference sidecar
+
+Every API worker that loads the meter model carries its own copy of the
+weights and the torch runtime. In sidecar mode the model is loaded once, in
+a separate process, and API workers send images to it over a local unix
+socket; the workers themselves never import torch.
+
+Start the sidecar next to the API (from backend/):
+    python -m services.meter_sidecar --workers 2
+
+then run the API with METER_EXECUTOR_KIND=sidecar and as many server
+workers as the node allows. Frames are length-prefixed pickles, so the
+socket is created readable by its owner only.
+"""
+if __name__ == "__main__":
+    # Same .env as the API; must be loaded before config is imported
+    from pathlib import Path
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / ".env", override=True)
+
+import argparse
+import asyncio
+import logging
+import os
+import pickle
+import struct
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from config import (
+    METER_MODEL_PATH, METER_ENGINE, METER_INT8, METER_EXECUTOR_MAX_QUEUE,
+    METER_EXECUTOR_WORKERS, METER_SIDECAR_SOCKET, METER_SIDECAR_CONNECT_TIMEOUT
+)
+from services.inference_executor import (
+    InferenceQueueFullError, MeterInferenceExecutor, meter_model_version
+)
+from services.metrics import observe_meter_results
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Any:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return pickle.loads(await reader.readexactly(length))
+
+
+def _write_frame(writer: asyncio.StreamWriter, message: Any):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_HEADER.pack(len(data)))
+    writer.write(data)
+
+
+class MeterSidecarServer:
+    """Serves a MeterInferenceExecutor to API workers over a unix socket"""
+
+    def __init__(self, executor: MeterInferenceExecutor, socket_path: str = METER_SIDECAR_SOCKET):
+        self.executor = executor
+        self.socket_path = socket_path
+
+    async def serve(self):
+        """Warm the model up, then accept connections until cancelled"""
+        await self.executor.warmup()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        logger.info(
+            f"Meter inference sidecar listening on {self.socket_path} "
+            f"(model version {self.executor.model_version})"
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests on one connection run concurrently; responses carry the
+        # request id, so they may be written back in any order
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                request_id, op, args = await _read_frame(reader)
+                task = asyncio.create_task(self._respond(writer, write_lock, request_id, op, args))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _respond(self, writer, write_lock: asyncio.Lock, request_id: int, op: str, args: Tuple):
+        try:
+            payload, ok = await self._dispatch(op, args), True
+        except Exception as e:
+            payload, ok = e, False
+        async with write_lock:
+            _write_frame(writer, (request_id, ok, payload))
+            await writer.drain()
+
+    async def _dispatch(self, op: str, args: Tuple) -> Any:
+        if op == "predict_batch":
+            return await self.executor.predict_batch(*args)
+        if op == "info":
+            return {
+                "model_path": self.executor.model_path,
+                "engine": self.executor.engine,
+                "int8": self.executor.int8,
+                "kind": self.executor.kind,
+                "workers": self.executor.max_workers,
+                "model_version": self.executor.model_version
+            }
+        raise ValueError(f"Unknown sidecar operation '{op}'")
+
+
+class MeterSidecarClient:
+    """
+    Drop-in replacement for MeterInferenceExecutor that predicts in the sidecar
+
+    Holds one multiplexed connection; requests are bounded by max_queue
+    like the local executor.
+    """
+
+    def __init__(
+        self,
+        socket_path: str = METER_SIDECAR_SOCKET,
+        max_queue: int = METER_EXECUTOR_MAX_QUEUE,
+        connect_timeout: float = METER_SIDECAR_CONNECT_TIMEOUT
+    ):
+        self.socket_path = socket_path
+        self.max_queue = max(1, max_queue)
+        self.connect_timeout = connect_timeout
+        # Local view of the configuration until the sidecar reports its own
+        self.model_path = METER_MODEL_PATH
+        self.engine = METER_ENGINE
+        self.int8 = METER_INT8
+        self.kind = "sidecar"
+        self.max_workers = METER_EXECUTOR_WORKERS
+        self._model_version: Optional[str] = None
+        self._pending = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._responses: Dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def model_version(self) -> str:
+        if self._model_version is None:
+            self._model_version = meter_model_version(self.model_path, self.engine, self.int8)
+        return self._model_version
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self):
+        """Nothing to start locally; the connection is opened on first use"""
+
+    async def warmup(self):
+        """Wait for the sidecar to accept connections and adopt its model version"""
+        info = await self._call("info")
+        self.model_path = info["model_path"]
+        self.engine = info["engine"]
+        self.int8 = info["int8"]
+        self.max_workers = info["workers"]
+        self._model_version = info["model_version"]
+        logger.info(f"Connected to meter inference sidecar at {self.socket_path} ({info['model_version']})")
+
+    def shutdown(self, wait: bool = True):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+        """Predict meter reading in the sidecar"""
+        result = (await self.predict_batch([image_bytes]))[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def predict_batch(self, images: List[bytes]) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Predict several images in one batched model call in the sidecar
+
+        Raises:
+            InferenceQueueFullError: if max_queue requests are already in flight
+        """
+        if self._pending >= self.max_queue:
+            raise InferenceQueueFullError(
+                f"Meter inference queue is full ({self._pending}/{self.max_queue})"
+            )
+        self._pending += 1
+        try:
+            results = await self._call("predict_batch", list(images))
+        finally:
+            self._pending -= 1
+        observe_meter_results(results)
+        return results
+
+    async def _connect(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+            self._write_lock = asyncio.Lock()
+
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.connect_timeout
+            while True:
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.socket_path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError) as e:
+                    # The sidecar may still be loading its model
+                    if loop.time() >= deadline:
+                        raise ConnectionError(
+                            f"Meter inference sidecar is not reachable at {self.socket_path}"
+                        ) from e
+                    await asyncio.sleep(0.5)
+
+            self._writer = writer
+            self._read_task = asyncio.create_task(self._read_responses(reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                request_id, ok, payload = await _read_frame(reader)
+                future = self._responses.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if ok:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.warning("Lost connection to meter inference sidecar")
+        finally:
+            self._writer = None
+            for future in self._responses.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Meter inference sidecar connection lost"))
+            self._responses.clear()
+
+    async def _call(self, op: str, *args) -> Any:
+        await self._connect()
+
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._responses[request_id] = future
+        try:
+            async with self._write_lock:
+                _write_frame(self._writer, (request_id, op, args))
+                await self._writer.drain()
+            return await future
+        finally:
+            self._responses.pop(request_id, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared meter inference sidecar")
+    parser.add_argument("--socket", default=METER_SIDECAR_SOCKET, help="Unix socket path")
+    parser.add_argument("--kind", choices=MeterInferenceExecutor.KINDS, default="thread",
+                        help="Worker pool inside the sidecar")
+    parser.add_argument("--workers", type=int, default=METER_EXECUTOR_WORKERS,
+                        help="Model instances inside the sidecar")
+    parser.add_argument("--max-queue", type=int, default=METER_EXECUTOR_MAX_QUEUE,
+                        help="Batches in flight across all API workers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    executor = MeterInferenceExecutor(kind=args.kind, max_workers=args.workers, max_queue=args.max_queue)
+    try:
+        asyncio.run(MeterSidecarServer(executor, args.socket).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
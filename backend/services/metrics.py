@@ -0,0 +1,118 @@
+"""
+Prometheus metrics for the backend
+
+Meter inference is instrumented per stage so latency regressions can be
+traced to image decoding, preprocessing, the model itself or queueing.
+When PROMETHEUS_MULTIPROC_DIR is set (several uvicorn/gunicorn workers),
+/metrics aggregates the samples of all worker processes.
+"""
+import os
+from typing import Any, Dict, List, Tuple, Union
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+
+from services.meter_preprocess import ImageDecodeError
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+METER_STAGE_SECONDS = Histogram(
+    "meter_stage_seconds",
+    "Time a meter batch spent in each pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+METER_QUEUE_WAIT_SECONDS = Histogram(
+    "meter_queue_wait_seconds",
+    "Time a meter request waited before processing started",
+    ["queue"],
+    buckets=STAGE_BUCKETS
+)
+METER_BATCH_SIZE = Histogram(
+    "meter_batch_size",
+    "Number of images per model batch",
+    buckets=BATCH_SIZE_BUCKETS
+)
+METER_PREDICTIONS = Counter(
+    "meter_predictions_total",
+    "Meter images processed by the detector",
+    ["outcome"]
+)
+METER_DECODE_FAILURES = Counter(
+    "meter_decode_failures_total",
+    "Uploaded meter images that could not be decoded"
+)
+METER_EMPTY_DETECTIONS = Counter(
+    "meter_empty_detections_total",
+    "Meter images on which no digits were detected"
+)
+METER_SERVED_IMGSZ = Counter(
+    "meter_served_imgsz_total",
+    "Meter images by the model input size their reading came from",
+    ["imgsz"]
+)
+METER_ACTIVE_MODEL = Gauge(
+    "meter_active_model_info",
+    "Meter model version serving traffic (1) and versions that did before (0)",
+    ["version"],
+    multiprocess_mode="liveall"
+)
+METER_CACHE_LOOKUPS = Counter(
+    "meter_cache_lookups_total",
+    "Meter result cache lookups",
+    ["result"]
+)
+
+
+_active_model_version = None
+
+
+def set_active_meter_model(version: str):
+    """Point meter_active_model_info at the version now serving traffic"""
+    global _active_model_version
+    if _active_model_version is not None and _active_model_version != version:
+        METER_ACTIVE_MODEL.labels(version=_active_model_version).set(0)
+    METER_ACTIVE_MODEL.labels(version=version).set(1)
+    _active_model_version = version
+
+
+def observe_meter_batch(timings: Dict[str, Any]):
+    """Record the stage timings reported with a batch's results"""
+    for stage, seconds in timings.items():
+        if stage != "batch_size":
+            METER_STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    METER_BATCH_SIZE.observe(timings.get("batch_size", 1))
+
+
+def observe_meter_results(results: List[Union[Dict[str, Any], Exception]]):
+    """Record stage timings and per-image outcomes of one model batch"""
+    timings = next((r["timings"] for r in results if isinstance(r, dict) and "timings" in r), None)
+    if timings:
+        observe_meter_batch(timings)
+
+    for result in results:
+        if isinstance(result, ImageDecodeError):
+            METER_DECODE_FAILURES.inc()
+            METER_PREDICTIONS.labels(outcome="decode_error").inc()
+        elif isinstance(result, Exception):
+            METER_PREDICTIONS.labels(outcome="error").inc()
+        elif not result.get("detections"):
+            METER_EMPTY_DETECTIONS.inc()
+            METER_PREDICTIONS.labels(outcome="empty").inc()
+        else:
+            METER_PREDICTIONS.labels(outcome="ok").inc()
+        if isinstance(result, dict) and "imgsz" in result:
+            METER_SERVED_IMGSZ.labels(imgsz=str(result["imgsz"])).inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Current metrics in Prometheus text format, with its content type"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,6 +1,8 @@
 import json
 import logging
-from typing import List, Dict, Any, Optional, TypedDict, Annotated
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Dict, Any, Optional, Tuple, TypedDict, Annotated
 from operator import add
 
 from neo4j import GraphDatabase
@@ -11,7 +13,15 @@ from langgraph.graph import StateGraph, END, START
 from config import (
     OPENAI_API_KEY, OPENAI_MODEL, OPENAI_EMBEDDING_MODEL,
     NEO4J_URI, NEO4J_USERNAME, NEO4J_PASSWORD, NEO4J_DATABASE,
-    JSON_DATA_PATH
+    JSON_DATA_PATH, EMBEDDING_CACHE_DIR, EMBEDDING_PARALLELISM, NEO4J_ACTIVE_SLOT_REFRESH,
+    LAW_GRAPH_ATTACH_ONLY
+)
+from services.embedding_cache import EmbeddingCache
+from services.law_rebuild import GraphLock, GraphLockedError
+from services.law_graph import (
+    LABELS, NAMESPACES, DEFAULT_NAMESPACE, SCHEMA_VERSION, LawNamespace, load_corpus, corpus_hash,
+    load_law_graph, sync_law_graph, write_embeddings, read_active_namespace, set_active_namespace,
+    clear_namespace, read_graph_metadata, write_graph_metadata, read_build_state, write_build_state
 )
 
 logger = logging.getLogger(__name__)
@@ -39,9 +49,21 @@ class Neo4jGraphRAGService:
         neo4j_uri: str = NEO4J_URI,
         neo4j_username: str = NEO4J_USERNAME,
         neo4j_password: str = NEO4J_PASSWORD,
-        neo4j_database: str = NEO4J_DATABASE
+        neo4j_database: str = NEO4J_DATABASE,
+        attach_only: bool = LAW_GRAPH_ATTACH_ONLY,
+        embed_parallelism: int = EMBEDDING_PARALLELISM
     ):
+        """
+        Connect to Neo4j and make sure the law graph is ready to query
+
+        With attach_only set startup never writes the graph: an out-of-date
+        or missing graph is served as is until the ingestion CLI
+        (python -m services.law_ingest) or the admin rebuild/sync endpoints,
+        which run under the GraphLock, have prepared it.
+        """
         self.json_path = json_path
+        self.attach_only = attach_only
+        self.embed_parallelism = max(1, embed_parallelism)
 
         # Validate configuration
         if not OPENAI_API_KEY:
@@ -63,6 +85,12 @@ class Neo4jGraphRAGService:
         self.expected_dimensions = 3072 if 'large' in OPENAI_EMBEDDING_MODEL else 1536
         logger.info(f"Using embedding model: {OPENAI_EMBEDDING_MODEL} ({self.expected_dimensions} dimensions)")
 
+        # Local cache so rebuilds only send unseen law text to the API
+        self.embedding_cache = (
+            EmbeddingCache(EMBEDDING_CACHE_DIR, OPENAI_EMBEDDING_MODEL, self.expected_dimensions)
+            if EMBEDDING_CACHE_DIR else None
+        )
+
         # Initialize Neo4j connection with connection pooling
         try:
             self.driver = GraphDatabase.driver(
@@ -83,15 +111,32 @@ class Neo4jGraphRAGService:
             logger.error(f"Please ensure Neo4j is running at {neo4j_uri}")
             raise ConnectionError(f"Neo4j connection failed: {e}")
 
-        # Load data
-        with open(json_path, 'r', encoding='utf-8') as f:
-            self.law_data = json.load(f)
+        # Blue/green slot the graph is served from; rebuilds fill the other one
+        self.namespace = DEFAULT_NAMESPACE
+        self._namespace_checked = 0.0
+        self.refresh_namespace(force=True)
 
-        # Initialize or verify graph
-        self._initialize_graph()
+        # The law JSON is only parsed if the graph has to be built or synced
+        self._law_data: Optional[List[Dict[str, Any]]] = None
+        self.corpus_hash = corpus_hash(json_path)
 
-        # Initialize Neo4j vector index
-        self._initialize_neo4j_vector_index()
+        if self._graph_is_current():
+            logger.info(
+                f"Law graph ({self.namespace.slot} slot) is up to date with the corpus, "
+                f"embedding model and schema; skipping initialization"
+            )
+        elif attach_only:
+            logger.warning(
+                f"Law graph ({self.namespace.slot} slot, {self.count_nodes()} nodes) is not prepared "
+                f"for the current corpus; attaching to it as is until python -m services.law_ingest "
+                f"or POST /api/chatbot/admin/rebuild-index has prepared it"
+            )
+        else:
+            try:
+                self.prepare_graph()
+            except GraphLockedError as e:
+                # Another worker or the ingestion CLI is preparing it
+                logger.warning(f"{e}; attaching to the law graph as is")
 
         # Build LangGraph workflow
         self.workflow = self._build_workflow()
@@ -104,262 +149,138 @@ class Neo4jGraphRAGService:
             result = session.run(query, parameters or {})
             return [dict(record) for record in result]
 
+    @property
+    def law_data(self) -> List[Dict[str, Any]]:
+        if self._law_data is None:
+            self._law_data, self.corpus_hash = load_corpus(self.json_path)
+        return self._law_data
+
+    def _expected_metadata(self) -> Dict[str, Any]:
+        return {
+            "corpus_hash": self.corpus_hash,
+            "embedding_model": OPENAI_EMBEDDING_MODEL,
+            "dimensions": self.expected_dimensions,
+            "schema_version": SCHEMA_VERSION
+        }
+
+    def _graph_is_current(self) -> bool:
+        """Whether the active slot was completed with this corpus, model and schema"""
+        try:
+            with self.driver.session(database=self.database) as session:
+                metadata = read_graph_metadata(session, self.namespace)
+        except Exception as e:
+            logger.warning(f"Could not read law graph metadata: {e}")
+            return False
+
+        if metadata is None:
+            return False
+        stale = {
+            key: (metadata.get(key), value) for key, value in self._expected_metadata().items()
+            if metadata.get(key) != value
+        }
+        if stale:
+            logger.info(f"Law graph metadata out of date (stored, expected): {stale}")
+        return not stale
+
+    def _record_metadata(self, namespace: LawNamespace) -> bool:
+        """Mark the slot complete, unless some nodes still lack embeddings"""
+        missing = self._count_missing_embeddings(namespace)
+        if missing:
+            logger.warning(f"{missing} nodes have no embedding; initialization will run again on next start")
+            return False
+
+        metadata = dict(self._expected_metadata(), nodes=self.count_nodes(namespace))
+        with self.driver.session(database=self.database) as session:
+            write_graph_metadata(session, namespace, metadata)
+        return True
+
+    def prepare_graph(self) -> bool:
+        """
+        Load or sync the active slot, then embed and index it
+
+        Idempotent: nodes and edges are merged and only nodes without an
+        embedding are embedded, so an interrupted run resumes where it
+        stopped.
+
+        Returns:
+            Whether the slot is complete, i.e. every node has an embedding
+
+        Raises:
+            GraphLockedError: if a rebuild, sync or ingestion is running
+        """
+        with GraphLock(self.driver, self.database, "ingest") as lock:
+            self.refresh_namespace(force=True)
+
+            # Initialize or verify graph
+            self._initialize_graph()
+
+            # Initialize Neo4j vector index
+            self._initialize_neo4j_vector_index()
+            complete = self._record_metadata(self.namespace)
+            lock.result = {"slot": self.namespace.slot, "complete": complete}
+        return complete
+
+    def refresh_namespace(self, force: bool = False) -> LawNamespace:
+        """Re-read the active slot, at most every NEO4J_ACTIVE_SLOT_REFRESH seconds"""
+        now = time.monotonic()
+        if not force and now - self._namespace_checked < NEO4J_ACTIVE_SLOT_REFRESH:
+            return self.namespace
+
+        self._namespace_checked = now
+        try:
+            with self.driver.session(database=self.database) as session:
+                namespace = read_active_namespace(session)
+        except Exception as e:
+            logger.warning(f"Could not read the active law graph slot: {e}")
+            return self.namespace
+
+        if namespace != self.namespace:
+            logger.info(f"Serving the law graph from the {namespace.slot} slot")
+            self.namespace = namespace
+        return self.namespace
+
+    def count_nodes(self, namespace: Optional[LawNamespace] = None) -> int:
+        """Law nodes in a slot, the active one by default"""
+        namespace = namespace or self.namespace
+        result = self._execute_query(f"MATCH (n:{namespace.any_label}) RETURN count(n) as count")
+        return result[0]['count'] if result else 0
+
     def _initialize_graph(self):
         """Initialize Neo4j graph schema and load data"""
         # Check if data already exists
-        result = self._execute_query("MATCH (n) RETURN count(n) as count")
-        node_count = result[0]['count'] if result else 0
+        node_count = self.count_nodes()
 
         if node_count > 0:
-            logger.info(f"Graph already initialized with {node_count} nodes")
+            # Apply only what changed in the law JSON since the last load
+            logger.info(f"Graph already initialized with {node_count} nodes, syncing changes")
+            sync_law_graph(self.driver, self.database, self.law_data, namespace=self.namespace)
             return
 
         logger.info("Initializing Neo4j graph with law data...")
 
-        # Create constraints and indexes
-        try:
-            self._execute_query("CREATE CONSTRAINT chapter_id IF NOT EXISTS FOR (c:Chapter) REQUIRE c.id IS UNIQUE")
-        except:
-            pass
-        try:
-            self._execute_query("CREATE CONSTRAINT article_id IF NOT EXISTS FOR (a:Article) REQUIRE a.id IS UNIQUE")
-        except:
-            pass
-        try:
-            self._execute_query("CREATE CONSTRAINT clause_id IF NOT EXISTS FOR (c:Clause) REQUIRE c.id IS UNIQUE")
-        except:
-            pass
-        try:
-            self._execute_query("CREATE CONSTRAINT point_id IF NOT EXISTS FOR (p:Point) REQUIRE p.id IS UNIQUE")
-        except:
-            pass
-
-        # Load data into graph
-        for chapter in self.law_data:
-            self._create_chapter_graph(chapter)
-
-        # Create reference relationships
-        self._create_references()
-
-        result = self._execute_query("MATCH (n) RETURN count(n) as count")
-        logger.info(f"Graph initialized with {result[0]['count']} nodes")
-
-    def _create_chapter_graph(self, chapter: Dict[str, Any]):
-        """Create nodes and relationships for a chapter"""
-        chapter_id = chapter["chapter_id"]
-        chapter_title = chapter["title"]
-
-        # Create chapter node
-        self._execute_query("""
-            MERGE (c:Chapter {id: $id})
-            SET c.title = $title, c.text = $text, c.level = 0
-        """, {"id": f"Chương_{chapter_id}", "title": chapter_title, "text": chapter_title})
-
-        # Handle sections
-        if chapter.get("sections"):
-            for section in chapter["sections"]:
-                section_id = section["section_id"]
-                section_title = section["title"]
-                section_node_id = f"Chương_{chapter_id}_Mục_{section_id}"
-
-                # Create section node
-                self._execute_query("""
-                    MERGE (s:Section {id: $id})
-                    SET s.title = $title, s.text = $text,
-                        s.section_id = $section_id, s.chapter_id = $chapter_id, s.level = 1
-                """, {
-                    "id": section_node_id,
-                    "title": f"Mục {section_id}: {section_title}",
-                    "text": section_title,
-                    "section_id": section_id,
-                    "chapter_id": chapter_id
-                })
-
-                # Create relationship
-                self._execute_query("""
-                    MATCH (c:Chapter {id: $chapter_id})
-                    MATCH (s:Section {id: $section_id})
-                    MERGE (c)-[:CONTAINS]->(s)
-                """, {"chapter_id": f"Chương_{chapter_id}", "section_id": section_node_id})
-
-                # Process articles in section
-                for article in section.get("articles", []):
-                    self._create_article_graph(article, chapter_id, section_node_id)
-
-        # Handle articles directly under chapter
-        elif chapter.get("articles"):
-            for article in chapter["articles"]:
-                self._create_article_graph(article, chapter_id, f"Chương_{chapter_id}")
-
-    def _create_article_graph(self, article: Dict[str, Any], chapter_id: str, parent_node_id: str):
-        """Create nodes for article, clauses, and points"""
-        article_id = article["article_id"]
-        article_title = article.get("title", "")
-        article_node_id = f"Điều_{article_id}"
-
-        # Create article node
-        self._execute_query("""
-            MERGE (a:Article {id: $id})
-            SET a.title = $title, a.text = $text,
-                a.article_id = $article_id, a.chapter_id = $chapter_id, a.level = 2
-        """, {
-            "id": article_node_id,
-            "title": f"Điều {article_id}: {article_title}",
-            "text": article_title,
-            "article_id": article_id,
-            "chapter_id": chapter_id
-        })
-
-        # Create relationship to parent
-        self._execute_query("""
-            MATCH (p {id: $parent_id})
-            MATCH (a:Article {id: $article_id})
-            MERGE (p)-[:CONTAINS]->(a)
-        """, {"parent_id": parent_node_id, "article_id": article_node_id})
-
-        # Process clauses
-        for clause in article.get("clauses", []):
-            clause_id = clause["clause_id"]
-            clause_text = clause["text"]
-            clause_node_id = f"Điều_{article_id}_Khoản_{clause_id}"
-
-            # Create clause node with references stored
-            self._execute_query("""
-                MERGE (c:Clause {id: $id})
-                SET c.text = $text, c.title = $title,
-                    c.article_id = $article_id, c.clause_id = $clause_id,
-                    c.chapter_id = $chapter_id, c.level = 3,
-                    c.references = $references
-            """, {
-                "id": clause_node_id,
-                "text": clause_text,
-                "title": f"Điều {article_id} - Khoản {clause_id}",
-                "article_id": article_id,
-                "clause_id": clause_id,
-                "chapter_id": chapter_id,
-                "references": json.dumps(clause.get("references", []))
-            })
-
-            # Create relationship
-            self._execute_query("""
-                MATCH (a:Article {id: $article_id})
-                MATCH (c:Clause {id: $clause_id})
-                MERGE (a)-[:CONTAINS]->(c)
-            """, {"article_id": article_node_id, "clause_id": clause_node_id})
-
-            # Process points
-            for point in clause.get("points", []):
-                point_id = point["point_id"]
-                point_text = point["text"]
-                point_node_id = f"Điều_{article_id}_Khoản_{clause_id}_Điểm_{point_id}"
-
-                self._execute_query("""
-                    MERGE (p:Point {id: $id})
-                    SET p.text = $text, p.title = $title,
-                        p.article_id = $article_id, p.clause_id = $clause_id,
-                        p.point_id = $point_id, p.chapter_id = $chapter_id,
-                        p.level = 4, p.references = $references
-                """, {
-                    "id": point_node_id,
-                    "text": point_text,
-                    "title": f"Điều {article_id} - Khoản {clause_id} - Điểm {point_id}",
-                    "article_id": article_id,
-                    "clause_id": clause_id,
-                    "point_id": point_id,
-                    "chapter_id": chapter_id,
-                    "references": json.dumps(point.get("references", []))
-                })
-
-                self._execute_query("""
-                    MATCH (c:Clause {id: $clause_id})
-                    MATCH (p:Point {id: $point_id})
-                    MERGE (c)-[:CONTAINS]->(p)
-                """, {"clause_id": clause_node_id, "point_id": point_node_id})
-
-    def _create_references(self):
-        """Create REFERENCES relationships based on stored reference data"""
-        # Get all nodes with references
-        result = self._execute_query("""
-            MATCH (n)
-            WHERE n.references IS NOT NULL AND n.references <> '[]'
-            RETURN n.id as node_id, n.references as refs,
-                   n.article_id as article_id, n.clause_id as clause_id
-        """)
+        # Bulk load: constraints, then UNWIND batches per label and edge type,
+        # including REFERENCES edges resolved in memory from law_data
+        load_law_graph(self.driver, self.database, self.law_data, namespace=self.namespace)
 
-        for record in result:
-            node_id = record['node_id']
-            references = json.loads(record['refs'])
-            current_article = record.get('article_id')
-            current_clause = record.get('clause_id')
-
-            for ref in references:
-                target = ref.get('target', {})
-                ref_text = ref.get('text', '')
-
-                # Resolve target node(s)
-                target_article = target.get('article')
-                if target_article == 'current':
-                    target_article = current_article
-
-                if target_article is None:
-                    continue
-
-                # Build target node IDs
-                target_nodes = []
-
-                if 'clauses' in target and isinstance(target['clauses'], list):
-                    for clause_num in target['clauses']:
-                        if clause_num == 'current':
-                            clause_num = current_clause
-                        target_nodes.append(f"Điều_{target_article}_Khoản_{clause_num}")
-                elif 'clause' in target:
-                    clause_num = target['clause']
-                    if clause_num == 'current':
-                        clause_num = current_clause
-                    target_nodes.append(f"Điều_{target_article}_Khoản_{clause_num}")
-                else:
-                    target_nodes.append(f"Điều_{target_article}")
-
-                # Handle points
-                if 'points' in target and isinstance(target['points'], list):
-                    base_clause = target.get('clause', current_clause)
-                    if base_clause == 'current':
-                        base_clause = current_clause
-                    for point_id in target['points']:
-                        target_nodes.append(f"Điều_{target_article}_Khoản_{base_clause}_Điểm_{point_id}")
-
-                # Create relationships
-                for target_node in target_nodes:
-                    try:
-                        self._execute_query("""
-                            MATCH (source {id: $source_id})
-                            MATCH (target {id: $target_id})
-                            MERGE (source)-[r:REFERENCES]->(target)
-                            SET r.text = $ref_text
-                        """, {
-                            "source_id": node_id,
-                            "target_id": target_node,
-                            "ref_text": ref_text
-                        })
-                    except:
-                        pass  # Skip if target doesn't exist
+        logger.info(f"Graph initialized with {self.count_nodes()} nodes")
 
     def _initialize_neo4j_vector_index(self):
         """Initialize Neo4j native vector index for semantic search"""
+        namespace = self.namespace
         # Check if vector index already exists and verify embedding dimensions
         result = self._execute_query("""
             SHOW INDEXES
             YIELD name, type
-            WHERE type = 'VECTOR'
+            WHERE type = 'VECTOR' AND name IN $names
             RETURN count(*) as count
-        """)
+        """, {"names": [namespace.index_name(label) for label in LABELS]})
         
         has_vector_index = result[0]['count'] > 0 if result else False
         
         # Check if embeddings exist and their dimensions
         if has_vector_index:
-            check_result = self._execute_query("""
-                MATCH (n) 
+            check_result = self._execute_query(f"""
+                MATCH (n:{namespace.any_label}) 
                 WHERE n.embedding IS NOT NULL 
                 RETURN size(n.embedding) as dim 
                 LIMIT 1
@@ -367,39 +288,49 @@ class Neo4jGraphRAGService:
             
             if check_result and check_result[0].get('dim'):
                 stored_dim = check_result[0]['dim']
-                # Expected dimension for text-embedding-3-large
-                expected_dim = 3072
+                expected_dim = self.expected_dimensions
                 
                 if stored_dim != expected_dim:
                     logger.warning(f"Embedding dimension mismatch! Stored: {stored_dim}, Expected: {expected_dim}")
                     logger.info("Clearing old embeddings and re-generating...")
                     
-                    # Clear old embeddings
-                    self._execute_query("MATCH (n) WHERE n.embedding IS NOT NULL SET n.embedding = NULL")
+                    # Clear old embeddings; the indexes are fixed to the old dimension
+                    self._execute_query(
+                        f"MATCH (n:{namespace.any_label}) WHERE n.embedding IS NOT NULL SET n.embedding = NULL"
+                    )
+                    for label in LABELS:
+                        self._execute_query(f"DROP INDEX {namespace.index_name(label)} IF EXISTS")
                     logger.info("Old embeddings cleared")
                 else:
                     logger.info(f"Neo4j vector index already exists with correct dimensions ({stored_dim})")
+                    # Nodes added or edited by a sync still need embeddings
+                    self._embed_missing_nodes(namespace)
                     return
             else:
                 logger.info("Neo4j vector index already exists")
+                self._embed_missing_nodes(namespace)
                 return
         
-        logger.info("Creating Neo4j vector index...")
+        self._create_vector_indexes(namespace)
+        self._embed_missing_nodes(namespace)
+        logger.info("Neo4j vector index initialized successfully")
+
+    def _create_vector_indexes(self, namespace: LawNamespace):
+        """Create one vector index per label of a slot"""
+        logger.info(f"Creating Neo4j vector indexes for the {namespace.slot} slot...")
         
         # Create vector index on all nodes (Neo4j 5.x doesn't support multi-label syntax)
         # We'll create separate indexes for each label
-        labels = ['Chapter', 'Section', 'Article', 'Clause', 'Point']
-        
-        for label in labels:
+        for label in LABELS:
             try:
-                index_name = f"law_vector_index_{label.lower()}"
+                index_name = namespace.index_name(label)
                 self._execute_query(f"""
                     CREATE VECTOR INDEX {index_name} IF NOT EXISTS
-                    FOR (n:{label})
+                    FOR (n:{namespace.label(label)})
                     ON n.embedding
                     OPTIONS {{
                         indexConfig: {{
-                            `vector.dimensions`: 3072,
+                            `vector.dimensions`: {self.expected_dimensions},
                             `vector.similarity_function`: 'cosine'
                         }}
                     }}
@@ -407,61 +338,236 @@ class Neo4jGraphRAGService:
                 logger.info(f"Vector index created for {label}")
             except Exception as e:
                 logger.warning(f"Vector index creation for {label}: {e}")
-        
-        # Generate and store embeddings for all nodes
-        result = self._execute_query("""
-            MATCH (n)
+
+    def _embed_missing_nodes(
+        self,
+        namespace: LawNamespace,
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> int:
+        """
+        Generate and store embeddings for nodes of a slot that have text but no embedding
+
+        Args:
+            namespace: Slot whose nodes are embedded
+            progress: Called with (nodes processed, nodes to embed) after each batch
+        """
+        result = self._execute_query(f"""
+            MATCH (n:{namespace.any_label})
             WHERE n.text IS NOT NULL AND n.embedding IS NULL
-            RETURN n.id as id, n.text as text, n.title as title
+            RETURN n.id as id, n.text as text, n.title as title, labels(n)[0] as label
             ORDER BY n.id
         """)
+        if not result:
+            return 0
         
         logger.info(f"Generating embeddings for {len(result)} nodes...")
         
         # Process in batches to avoid rate limits
         batch_size = 50
+        batches = [result[i:i + batch_size] for i in range(0, len(result), batch_size)]
         failed_batches = []
+        embedded = 0
+        processed = 0
+        embed_seconds = 0.0
+        write_seconds = 0.0
+        started = time.perf_counter()
         
-        for i in range(0, len(result), batch_size):
-            batch = result[i:i + batch_size]
-            
-            # Build text for each node
-            texts_to_embed = []
-            node_ids = []
-            
-            for record in batch:
-                text_parts = []
-                if record.get('title'):
-                    text_parts.append(record['title'])
-                if record.get('text'):
-                    text_parts.append(record['text'])
-                
-                full_text = "\n".join(text_parts)
-                if full_text.strip():
-                    texts_to_embed.append(full_text)
-                    node_ids.append(record['id'])
-            
-            # Generate embeddings with retry logic
-            if texts_to_embed:
+        # Batches are independent, so up to embed_parallelism run at once
+        with ThreadPoolExecutor(max_workers=max(1, self.embed_parallelism)) as pool:
+            futures = {pool.submit(self._embed_batch, batch): idx for idx, batch in enumerate(batches)}
+            for future in as_completed(futures):
+                idx = futures[future]
+                processed += len(batches[idx])
                 try:
-                    embeddings = self.embeddings.embed_documents(texts_to_embed)
-                    
-                    # Store embeddings in Neo4j (batch write)
-                    for node_id, embedding in zip(node_ids, embeddings):
-                        self._execute_query("""
-                            MATCH (n {id: $node_id})
-                            SET n.embedding = $embedding
-                        """, {"node_id": node_id, "embedding": embedding})
-                    
-                    logger.info(f"Processed {min(i + batch_size, len(result))}/{len(result)} nodes")
+                    count, batch_embed_seconds, batch_write_seconds = future.result()
+                    embedded += count
+                    embed_seconds += batch_embed_seconds
+                    write_seconds += batch_write_seconds
+                    logger.info(f"Processed {processed}/{len(result)} nodes")
                 except Exception as e:
-                    logger.error(f"Failed to process batch {i//batch_size + 1}: {e}")
-                    failed_batches.append(i)
+                    logger.error(f"Failed to process batch {idx + 1}: {e}")
+                    failed_batches.append(idx)
+
+                if progress is not None:
+                    progress(processed, len(result))
         
+        if self.embedding_cache is not None:
+            logger.info(
+                f"Embedding cache: {self.embedding_cache.hits} hits, {self.embedding_cache.misses} "
+                f"sent to the API ({len(self.embedding_cache)} cached texts)"
+            )
+        if embedded:
+            logger.info(
+                f"Stored {embedded} embeddings in {time.perf_counter() - started:.1f}s "
+                f"(parallelism {self.embed_parallelism}): API {embedded / max(embed_seconds, 1e-9):.1f} nodes/s "
+                f"({embed_seconds:.1f}s), Neo4j writes {embedded / max(write_seconds, 1e-9):.1f} nodes/s "
+                f"({write_seconds:.1f}s) per worker"
+            )
+
         if failed_batches:
             logger.warning(f"Failed to process {len(failed_batches)} batches. Consider retrying.")
+
+        return embedded
+
+    def _embed_batch(self, batch: List[Dict[str, Any]]) -> Tuple[int, float, float]:
+        """
+        Embed one batch of node records and store the embeddings
+
+        Returns:
+            (nodes stored, seconds embedding, seconds writing to Neo4j)
+        """
+        # Build text for each node
+        texts_to_embed = []
+        nodes = []
         
-        logger.info("Neo4j vector index initialized successfully")
+        for record in batch:
+            text_parts = []
+            if record.get('title'):
+                text_parts.append(record['title'])
+            if record.get('text'):
+                text_parts.append(record['text'])
+            
+            full_text = "\n".join(text_parts)
+            if full_text.strip():
+                texts_to_embed.append(full_text)
+                nodes.append(record)
+
+        if not texts_to_embed:
+            return 0, 0.0, 0.0
+        
+        started = time.perf_counter()
+        embeddings = self._embed_documents(texts_to_embed)
+        embed_seconds = time.perf_counter() - started
+        
+        # Store embeddings in Neo4j: one UNWIND statement per label
+        rows_by_label: Dict[str, List[Dict[str, Any]]] = {}
+        for record, embedding in zip(nodes, embeddings):
+            rows_by_label.setdefault(record['label'], []).append(
+                {"id": record['id'], "embedding": embedding}
+            )
+        embedded = 0
+        started = time.perf_counter()
+        with self.driver.session(database=self.database) as session:
+            for label, rows in rows_by_label.items():
+                embedded += write_embeddings(session, label, rows)
+        return embedded, embed_seconds, time.perf_counter() - started
+
+    def _count_missing_embeddings(self, namespace: LawNamespace) -> int:
+        result = self._execute_query(f"""
+            MATCH (n:{namespace.any_label})
+            WHERE n.text IS NOT NULL AND n.embedding IS NULL
+            RETURN count(n) as count
+        """)
+        return result[0]['count'] if result else 0
+
+    def sync_graph(self) -> Dict[str, int]:
+        """
+        Re-read the law JSON and apply only its changes to the graph
+
+        Changed or new nodes are re-embedded; everything else is untouched.
+
+        Returns:
+            sync_law_graph counts plus 'embedded'
+
+        Raises:
+            GraphLockedError: if a rebuild, sync or ingestion is running
+        """
+        with GraphLock(self.driver, self.database, "sync") as lock:
+            self._law_data, self.corpus_hash = load_corpus(self.json_path)
+
+            namespace = self.refresh_namespace(force=True)
+            counts = sync_law_graph(self.driver, self.database, self.law_data, namespace=namespace)
+            counts["embedded"] = self._embed_missing_nodes(namespace)
+            self._record_metadata(namespace)
+            lock.result = counts
+        return counts
+
+    def rebuild_graph(
+        self,
+        report: Optional[Callable[[str, int, int], None]] = None,
+        embed_retries: int = 0,
+        resume: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Build the law graph from scratch in the idle slot, then serve from it
+
+        Blocking; queries keep using the active slot until the new one is
+        fully embedded and indexed. The replaced slot is left in place for
+        queries still running on it and cleared by the next rebuild. The
+        caller must hold the GraphLock.
+
+        A rebuild that failed part-way leaves the idle slot marked as
+        unfinished. The next rebuild resumes into it (nodes and edges are
+        merged, only missing embeddings are computed) when it was started
+        for the same corpus, embedding model and schema; otherwise, or with
+        resume unset, the slot is cleared first.
+
+        Args:
+            report: Called with (phase, done, total) as the rebuild advances
+            embed_retries: Extra embedding passes over nodes whose batch failed
+            resume: Continue an unfinished rebuild of the idle slot if possible
+
+        Returns:
+            Slot now serving, with its node and edge counts
+
+        Raises:
+            RuntimeError: if nodes are left without embeddings; the active
+                slot is kept
+        """
+        report = report or (lambda phase, done, total: None)
+        active = self.refresh_namespace(force=True)
+        target = next(namespace for namespace in NAMESPACES.values() if namespace != active)
+        logger.warning(f"Rebuilding the law graph into the {target.slot} slot ({active.slot} keeps serving)")
+
+        law_data, law_hash = load_corpus(self.json_path)
+        build = dict(self._expected_metadata(), corpus_hash=law_hash)
+
+        report("clearing", 0, 1)
+        with self.driver.session(database=self.database) as session:
+            started = read_build_state(session, target)
+            if resume and started is not None and all(started.get(k) == v for k, v in build.items()):
+                logger.warning(f"Resuming the unfinished rebuild of the {target.slot} slot")
+            else:
+                clear_namespace(session, target)
+                write_build_state(session, target, build)
+
+        report("loading", 0, 1)
+        graph = load_law_graph(self.driver, self.database, law_data, namespace=target)
+
+        for attempt in range(embed_retries + 1):
+            report("embedding", 0, graph.node_count)
+            self._embed_missing_nodes(target, progress=lambda done, total: report("embedding", done, total))
+            missing = self._count_missing_embeddings(target)
+            if not missing:
+                break
+        if missing:
+            raise RuntimeError(
+                f"{missing} nodes of the {target.slot} slot have no embedding; "
+                f"still serving the {active.slot} slot"
+            )
+
+        report("indexing", 0, 1)
+        self._create_vector_indexes(target)
+        # Vector indexes populate asynchronously; switch only once they are online
+        self._execute_query("CALL db.awaitIndexes(600)")
+
+        report("switching", 0, 1)
+        self._law_data, self.corpus_hash = law_data, law_hash
+        self._record_metadata(target)
+        with self.driver.session(database=self.database) as session:
+            set_active_namespace(session, target)
+            write_build_state(session, target, None)
+        self.namespace = target
+        self._namespace_checked = time.monotonic()
+        logger.info(f"Law graph rebuilt; serving from the {target.slot} slot")
+
+        return {"slot": target.slot, "nodes": graph.node_count, "edges": graph.edge_count}
+
+    def _embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed law texts, through the local cache when enabled"""
+        if self.embedding_cache is None:
+            return self.embeddings.embed_documents(texts)
+        return self.embedding_cache.embed_documents(self.embeddings.embed_documents, texts)
 
     def _build_workflow(self) -> StateGraph:
         """Build LangGraph workflow for multi-step reasoning"""
@@ -521,17 +627,17 @@ Hãy trả về JSON với format:
         """Perform semantic search using Neo4j vector index"""
         retrieved_nodes = []
         seen_ids = set()
+        namespace = self.namespace
 
         for query in state["search_queries"]:
             # Generate embedding for query
             query_embedding = self.embeddings.embed_query(query)
             
             # Search across all vector indexes (one per label)
-            labels = ['chapter', 'section', 'article', 'clause', 'point']
             all_results = []
             
-            for label in labels:
-                index_name = f"law_vector_index_{label}"
+            for label in LABELS:
+                index_name = namespace.index_name(label)
                 cypher_query = f"""
                     CALL db.index.vector.queryNodes('{index_name}', $k, $query_embedding)
                     YIELD node, score
@@ -555,7 +661,7 @@ Hãy trả về JSON với format:
                         logger.debug(f"Vector search {label}: no results")
                 except Exception as e:
                     # Log only first occurrence to avoid spam
-                    if label == 'chapter':
+                    if label == LABELS[0]:
                         logger.warning(f"Vector search error: {str(e)[:150]}")
                     continue
             
@@ -568,14 +674,14 @@ Hãy trả về JSON với format:
                         retrieved_nodes.append({
                             "id": node_id,
                             "content": record.get("content", ""),
-                            "type": record.get("type", ""),
+                            "type": namespace.base_label(record.get("type", "")),
                             "score": float(record.get("score", 0.0))
                         })
             else:
                 # Fallback to text search if all vector searches fail
                 logger.warning(f"All vector searches failed for query '{query}', using text fallback")
-                fallback_query = """
-                    MATCH (n)
+                fallback_query = f"""
+                    MATCH (n:{namespace.any_label})
                     WHERE n.text CONTAINS $query OR n.title CONTAINS $query
                     RETURN n.id as id,
                            coalesce(n.title, '') + '\\n' + coalesce(n.text, '') as content,
@@ -591,7 +697,7 @@ Hãy trả về JSON với format:
                         retrieved_nodes.append({
                             "id": node_id,
                             "content": record.get("content", ""),
-                            "type": record.get("type", ""),
+                            "type": namespace.base_label(record.get("type", "")),
                             "score": 0.5
                         })
 
@@ -605,13 +711,14 @@ Hãy trả về JSON với format:
         """Expand context using graph traversal"""
         expanded_context = []
         visited = set()
+        namespace = self.namespace
 
         for node in state["retrieved_nodes"]:
             node_id = node["id"]
 
             # Use simple Cypher query (no APOC needed)
-            cypher_query = """
-            MATCH (start {id: $node_id})
+            cypher_query = f"""
+            MATCH (start:{namespace.any_label} {{id: $node_id}})
             OPTIONAL MATCH path1 = (start)-[:CONTAINS*0..2]->(child)
             OPTIONAL MATCH path2 = (start)-[:REFERENCES]->(ref)
             OPTIONAL MATCH path3 = (parent)-[:CONTAINS]->(start)
@@ -636,7 +743,7 @@ Hãy trả về JSON với format:
                         expanded_context.append({
                             "id": record['id'],
                             "content": record.get('text') or record.get('title') or "",
-                            "type": record.get('type') or "unknown",
+                            "type": namespace.base_label(record.get('type') or "unknown"),
                             "level": record.get('level') or 0
                         })
             except Exception as e:
@@ -746,6 +853,9 @@ NỘI DUNG LUẬT:
         user_role: Optional[str] = None
     ) -> Dict[str, Any]:
         """Main query method using LangGraph workflow"""
+        # Pick up a slot switched to by a rebuild in another worker
+        self.refresh_namespace()
+
         initial_state = GraphState(
             question=question,
             query_analysis=None,
@@ -789,16 +899,19 @@ NỘI DUNG LUẬT:
         try:
             stats = {}
             
+            namespace = self.namespace
+            stats['active_slot'] = namespace.slot
+            
             # Node counts by type
-            result = self._execute_query("""
-                MATCH (n)
+            result = self._execute_query(f"""
+                MATCH (n:{namespace.any_label})
                 RETURN labels(n)[0] as label, count(n) as count
             """)
-            stats['node_counts'] = {r['label']: r['count'] for r in result if r['label']}
+            stats['node_counts'] = {namespace.base_label(r['label']): r['count'] for r in result if r['label']}
             
             # Embedding coverage
-            result = self._execute_query("""
-                MATCH (n)
+            result = self._execute_query(f"""
+                MATCH (n:{namespace.any_label})
                 WHERE n.embedding IS NOT NULL
                 RETURN count(n) as embedded_count
             """)
@@ -814,8 +927,7 @@ NỘI DUNG LUẬT:
             stats['vector_indexes'] = {r['name']: r['state'] for r in result}
             
             # Total nodes
-            result = self._execute_query("MATCH (n) RETURN count(n) as total")
-            stats['total_nodes'] = result[0]['total'] if result else 0
+            stats['total_nodes'] = self.count_nodes(namespace)
             
             return stats
         except Exception as e:
@@ -835,16 +947,19 @@ NỘI DUNG LUẬT:
         try:
             stats = {}
             
+            namespace = self.namespace
+            stats['active_slot'] = namespace.slot
+            
             # Node counts
-            result = self._execute_query("""
-                MATCH (n)
+            result = self._execute_query(f"""
+                MATCH (n:{namespace.any_label})
                 RETURN labels(n)[0] as label, count(n) as count
             """)
-            stats['node_counts'] = {r['label']: r['count'] for r in result}
+            stats['node_counts'] = {namespace.base_label(r['label']): r['count'] for r in result}
             
             # Embedding coverage
-            result = self._execute_query("""
-                MATCH (n)
+            result = self._execute_query(f"""
+                MATCH (n:{namespace.any_label})
                 WHERE n.embedding IS NOT NULL
                 RETURN count(n) as embedded_count
             """)
@@ -0,0 +1,57 @@
+"""
+Startup state of the backend's subsystems
+
+Heavy initialization (model loading, Neo4j graph setup) runs in the
+background after the server starts. Each subsystem reports its state here
+so the readiness probe can tell load balancers when a worker can take
+traffic.
+"""
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+PENDING = "pending"
+STARTING = "starting"
+READY = "ready"
+FAILED = "failed"
+
+
+class ReadinessRegistry:
+    """Thread-safe record of per-subsystem startup state"""
+
+    def __init__(self, required: Iterable[str] = ()):
+        self.required = set(required)
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str):
+        with self._lock:
+            self._states.setdefault(name, {"state": PENDING})
+
+    def mark(self, name: str, state: str, error: Optional[str] = None, **details):
+        """Record a state transition, with optional error and details"""
+        with self._lock:
+            entry = self._states.setdefault(name, {})
+            entry["state"] = state
+            entry["since"] = time.time()
+            entry.pop("error", None)
+            if error:
+                entry["error"] = error
+            entry.update(details)
+
+    def state(self, name: str) -> str:
+        with self._lock:
+            return self._states.get(name, {}).get("state", PENDING)
+
+    def is_ready(self) -> bool:
+        """True once every required subsystem is ready"""
+        return all(self.state(name) == READY for name in self.required)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-subsystem state for the readiness endpoint"""
+        with self._lock:
+            subsystems = {
+                name: {**entry, "required": name in self.required}
+                for name, entry in self._states.items()
+            }
+        return {"ready": self.is_ready(), "subsystems": subsystems}
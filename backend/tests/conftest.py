@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import config and services the way the app does, from backend/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,64 @@
+"""
+Exported meter engines must match the PyTorch model on the parity fixtures
+
+Opt-in end-to-end check; test_meter_engines.py covers the comparison
+itself without a model. Needs ultralytics, the model weights and a fixture folder
+(METER_PARITY_FIXTURES_DIR); skipped otherwise. Run from backend/:
+
+    METER_PARITY_FIXTURES_DIR=data/meter_fixtures python -m pytest tests
+"""
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("ultralytics")
+
+from config import METER_MODEL_PATH, METER_PARITY_FIXTURES_DIR  # noqa: E402
+from services.meter_engines import _artifact_path, resolve_model_path  # noqa: E402
+
+if not METER_PARITY_FIXTURES_DIR or not Path(METER_PARITY_FIXTURES_DIR).is_dir():
+    pytest.skip("METER_PARITY_FIXTURES_DIR is not set to a fixture folder", allow_module_level=True)
+if not os.path.isfile(METER_MODEL_PATH):
+    pytest.skip(f"Meter model {METER_MODEL_PATH} not found", allow_module_level=True)
+
+# Engine -> module its exported artifact is served with
+ENGINE_RUNTIMES = {"onnx": "onnxruntime", "openvino": "openvino"}
+
+
+@pytest.fixture(params=list(ENGINE_RUNTIMES))
+def engine(request):
+    if importlib.util.find_spec(ENGINE_RUNTIMES[request.param]) is None:
+        pytest.skip(f"{ENGINE_RUNTIMES[request.param]} is not installed")
+    return request.param
+
+
+def _parity_report(engine: str, cache_dir: Path) -> dict:
+    target = _artifact_path(METER_MODEL_PATH, engine, cache_dir)
+    return json.loads(Path(f"{target}.parity.json").read_text())
+
+
+def test_exported_engine_matches_pytorch(engine, tmp_path):
+    path = resolve_model_path(
+        METER_MODEL_PATH, engine, str(tmp_path), METER_PARITY_FIXTURES_DIR, int8=False
+    )
+
+    assert Path(path).exists()
+    report = _parity_report(engine, tmp_path)
+    assert report["images"] > 0
+    assert report["passed"], report["mismatches"]
+
+
+def test_cached_artifact_without_report_is_verified(engine, tmp_path):
+    # Exported while no fixtures were configured: served without a report
+    resolve_model_path(METER_MODEL_PATH, engine, str(tmp_path), "", int8=False)
+    target = _artifact_path(METER_MODEL_PATH, engine, tmp_path)
+    assert not Path(f"{target}.parity.json").exists()
+
+    resolve_model_path(
+        METER_MODEL_PATH, engine, str(tmp_path), METER_PARITY_FIXTURES_DIR, int8=False
+    )
+
+    assert _parity_report(engine, tmp_path)["passed"]
@@ -0,0 +1,93 @@
+"""
+Parity comparison between the PyTorch model and an exported engine, on
+stub services and synthetic detections (no model or fixtures needed)
+"""
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from services.meter_engines import (
+    PARITY_CONF_TOLERANCE, PARITY_X_TOLERANCE, check_parity, compare_results
+)
+
+
+def _result(*digits: Tuple[str, float, float]) -> Dict[str, Any]:
+    """predict() result for (label, x, conf) detections in reading order"""
+    return {
+        "text": " ".join(label for label, _, _ in digits),
+        "detections": [{"label": label, "x": x, "conf": conf, "row": 0} for label, x, conf in digits]
+    }
+
+
+READING = _result(("1", 10.0, 0.95), ("2", 40.0, 0.9), ("3", 70.0, 0.92))
+
+
+class StubService:
+    """Stands in for MeterReadingService: a fixed result per image"""
+
+    def __init__(self, results: Dict[bytes, Dict[str, Any]]):
+        self.results = results
+
+    def predict(self, image_bytes: bytes) -> Dict[str, Any]:
+        if image_bytes not in self.results:
+            raise ValueError("Failed to decode image")
+        return self.results[image_bytes]
+
+
+@pytest.fixture
+def fixture_dir(tmp_path):
+    for name in ("a.jpg", "b.png", "broken.jpg"):
+        (tmp_path / name).write_bytes(name.encode())
+    (tmp_path / "notes.txt").write_text("not a fixture")
+    return tmp_path
+
+
+def test_results_within_tolerance_match():
+    drifted = _result(
+        ("1", 10.0 + PARITY_X_TOLERANCE / 2, 0.95 - PARITY_CONF_TOLERANCE / 2),
+        ("2", 40.0, 0.9),
+        ("3", 70.0, 0.92)
+    )
+    assert compare_results(READING, drifted) is None
+
+
+def test_box_drift_is_reported():
+    drifted = _result(("1", 10.0, 0.95), ("2", 40.0 + PARITY_X_TOLERANCE * 2, 0.9), ("3", 70.0, 0.92))
+    assert compare_results(READING, drifted).startswith("x ")
+
+
+def test_confidence_drift_is_reported():
+    drifted = _result(("1", 10.0, 0.95), ("2", 40.0, 0.9), ("3", 70.0, 0.92 - PARITY_CONF_TOLERANCE * 2))
+    assert compare_results(READING, drifted).startswith("conf ")
+
+
+@pytest.mark.parametrize("candidate", [
+    _result(("1", 10.0, 0.95), ("2", 40.0, 0.9)),
+    _result(),
+])
+def test_missing_detection_is_reported(candidate):
+    assert compare_results(READING, candidate) is not None
+
+
+def test_check_parity_passes_on_identical_services(fixture_dir):
+    results = {b"a.jpg": READING, b"b.png": _result()}
+
+    report = check_parity(StubService(results), StubService(dict(results)), str(fixture_dir))
+
+    assert report["images"] == 3
+    assert report["mismatches"] == []
+    assert report["passed"]
+
+
+def test_check_parity_lists_mismatching_fixtures(fixture_dir):
+    reference = StubService({b"a.jpg": READING, b"b.png": READING})
+    candidate = StubService({
+        b"a.jpg": READING,
+        b"b.png": _result(("1", 10.0, 0.95), ("2", 40.0, 0.9))
+    })
+
+    report = check_parity(reference, candidate, str(fixture_dir))
+
+    mismatches: List[Dict[str, str]] = report["mismatches"]
+    assert [m["image"] for m in mismatches] == ["b.png"]
+    assert not report["passed"]